@@ -1,23 +1,27 @@
-import io
-import random
-import tempfile
+import itertools
 import os
-from flask import Flask, request, jsonify, render_template, send_file
-from werkzeug.utils import secure_filename
+import traceback
+from functools import lru_cache
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+from werkzeug.utils import secure_filename as _secure_filename
 
 # --- Import from your existing script ---
 try:
     from modular_chord_generator import (
-        PITCH_MAP, NOTE_NAMES, SCALES, DIATONIC_QUALITIES, CHORD_VOICINGS,
+        PITCH_MAP, NOTE_NAMES, SCALES, DIATONIC_QUALITIES,
+        CHORD_SYMBOLS, VALID_QUALITIES,
         get_diatonic_chords, get_chord_pitches
     )
-    from modular_chord_generator import Note, Chord, Track, Composition, MidiExporter
+    from modular_chord_generator import Track, Composition, MidiExporter
 except ImportError as e:
     print(f"Error importing from modular_chord_generator.py: {e}")
     exit()
 
 app = Flask(__name__)
 
+# Users re-export the same few song titles, so memoize the filename sanitizing
+secure_filename = lru_cache(maxsize=1024)(_secure_filename)
+
 # --- App Configuration ---
 TIME_SIGNATURE = (4, 4)
 INSTRUMENT_PROGRAM = 50 
@@ -69,10 +73,99 @@ CHORD_PALETTE_RULES = {
 }
 
 
+def error_response(e: Exception):
+    """
+    Builds a 500 JSON error response. The traceback is logged server-side and
+    only included in the response body when the app runs in debug mode.
+    """
+    app.logger.exception("Request failed")
+    payload = {"error": str(e)}
+    if app.debug:
+        payload["trace"] = traceback.format_exc()
+    return jsonify(payload), 500
+
+
+@lru_cache(maxsize=1)
+def render_index() -> str:
+    # index.html has no template variables, so it only needs rendering once
+    return render_template('index.html')
+
+
 @app.route('/')
 def index():
     """Serves the main HTML page."""
-    return render_template('index.html')
+    if app.debug:
+        return render_template('index.html') # Pick up template edits while developing
+    return render_index()
+
+def build_chord_palette(key: str, scale: str) -> list[dict]:
+    """
+    Builds the structured list of chord options for each degree
+    of a given key and scale.
+    """
+    # 1. Get info from music theory definitions
+    root_val = PITCH_MAP[key]
+    intervals = SCALES[scale]
+    qualities = DIATONIC_QUALITIES[scale] # e.g., ['maj', 'min', 'min', ...]
+    
+    palette = []
+    for i in range(7):
+        # 2. Get the root note name
+        note_val = (root_val + intervals[i]) % 12
+        root_name = NOTE_NAMES[note_val]
+        
+        # 3. Get the base diatonic quality (e.g., 'maj', 'min', 'dom7')
+        base_quality = qualities[i]
+
+        degree_info = {
+            "degree": i + 1,
+            "root": root_name,
+            "base_quality": base_quality,
+            "options": []
+        }
+
+        # 4. Get the expansion rules for this base quality
+        rules = CHORD_PALETTE_RULES.get(base_quality, [
+            {'symbol_suffix': base_quality, 'type': 'diatonic'}
+        ])
+        
+        seen_symbols = set()
+        for rule in rules:
+            # 5. Only add it if we have a voicing for it in the backend
+            if rule['symbol_suffix'] in VALID_QUALITIES:
+                 # 6. Look up the full chord symbol (e.g., "C" + "maj7" -> "Cmaj7")
+                 full_symbol = CHORD_SYMBOLS[(root_name, rule['symbol_suffix'])]
+                 degree_info['options'].append({
+                    "symbol": full_symbol,
+                    "type": rule['type']
+                })
+                 seen_symbols.add(full_symbol)
+
+        # Ensure at least the base chord is there if rules missed it
+        base_chord_symbol = CHORD_SYMBOLS[(root_name, base_quality)]
+        if base_chord_symbol not in seen_symbols and base_quality in VALID_QUALITIES:
+             degree_info['options'].insert(0, {
+                 "symbol": base_chord_symbol,
+                 "type": "diatonic"
+             })
+
+        palette.append(degree_info)
+        
+    return palette
+
+
+# The palette only depends on (key, scale), and there are just 12 keys
+# (the route upper-cases the key, so only NOTE_NAMES spellings can match)
+# times a handful of scales. Serialize every palette once at import time
+# so requests are a single dict lookup. app.json.dumps keeps json's spaced
+# separators, so pass the compact ones jsonify uses.
+PALETTE_CACHE = {
+    (key, scale): app.json.dumps(build_chord_palette(key, scale), separators=(',', ':'))
+    for key in NOTE_NAMES
+    for scale in SCALES
+    if scale in DIATONIC_QUALITIES
+}
+
 
 ### NEW: Smarter Endpoint ###
 @app.route('/get-chord-palette')
@@ -90,60 +183,17 @@ def api_get_chord_palette():
     if scale not in SCALES or scale not in DIATONIC_QUALITIES:
          return jsonify({"error": f"Invalid scale type: {scale}"}), 400
 
-    try:
-        # 1. Get info from music theory definitions
-        root_val = PITCH_MAP[key.upper()]
-        intervals = SCALES[scale]
-        qualities = DIATONIC_QUALITIES[scale] # e.g., ['maj', 'min', 'min', ...]
-        
-        palette = []
-        for i in range(7):
-            # 2. Get the root note name
-            note_val = (root_val + intervals[i]) % 12
-            root_name = NOTE_NAMES[note_val]
-            
-            # 3. Get the base diatonic quality (e.g., 'maj', 'min', 'dom7')
-            base_quality = qualities[i]
-
-            degree_info = {
-                "degree": i + 1,
-                "root": root_name,
-                "base_quality": base_quality,
-                "options": []
-            }
-
-            # 4. Get the expansion rules for this base quality
-            rules = CHORD_PALETTE_RULES.get(base_quality, [
-                {'symbol_suffix': base_quality, 'type': 'diatonic'}
-            ])
-            
-            for rule in rules:
-                # 5. Build the full chord symbol (e.g., "C" + "maj7" -> "Cmaj7")
-                full_symbol = f"{root_name}{rule['symbol_suffix']}"
-                
-                # 6. Only add it if we have a voicing for it in the backend
-                if rule['symbol_suffix'] in CHORD_VOICINGS:
-                     degree_info['options'].append({
-                        "symbol": full_symbol,
-                        "type": rule['type']
-                    })
-
-            # Ensure at least the base chord is there if rules missed it
-            base_chord_symbol = f"{root_name}{base_quality}"
-            if not any(opt['symbol'] == base_chord_symbol for opt in degree_info['options']) \
-               and base_quality in CHORD_VOICINGS:
-                 degree_info['options'].insert(0, {
-                     "symbol": base_chord_symbol,
-                     "type": "diatonic"
-                 })
-
-            palette.append(degree_info)
-            
-        return jsonify(palette)
+    body = PALETTE_CACHE.get((key.upper(), scale))
+    if body is None:
+        return jsonify({"error": f"Invalid key: {key}"}), 400
 
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    return Response(body, mimetype='application/json')
+
+
+@lru_cache(maxsize=None)
+def _cached_diatonic_chords(key: str, scale: str) -> tuple[str, ...]:
+    # Tuple so the memoized value can't be mutated by a caller
+    return tuple(get_diatonic_chords(key, scale))
 
 
 # This endpoint is no longer used by the new frontend,
@@ -155,10 +205,10 @@ def api_get_diatonic_chords():
     if not key or not scale:
         return jsonify({"error": "Missing 'key' or 'scale' parameter"}), 400
     try:
-        chords = get_diatonic_chords(key, scale)
-        return jsonify(chords)
+        chords = _cached_diatonic_chords(key, scale)
+        return jsonify(list(chords))
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
 
 @app.route('/generate-midi', methods=['POST'])
@@ -197,7 +247,7 @@ def api_generate_midi():
             if 'progression_symbols' in part and part['progression_symbols']:
                 part_chord_symbols = part['progression_symbols']
             elif 'progression_degrees' in part and part['progression_degrees']:
-                diatonic_chords = get_diatonic_chords(part['key'], part['scale_type'])
+                diatonic_chords = _cached_diatonic_chords(part['key'], part['scale_type'])
                 for degree in part['progression_degrees']:
                     degree_index = int(degree) - 1
                     if 0 <= degree_index < 7:
@@ -207,75 +257,70 @@ def api_generate_midi():
                 continue
 
             num_loops = int(part.get('num_loops', 1))
+
+            # Per-part settings are bound once, outside the chord loop
+            rhythm_beats = part['rhythm_beats']
+            if not rhythm_beats:
+                continue
+            inversions = part['inversions']
+            octave_pattern = part['octave_pattern']
+            play_style = part.get('play_style', 'block')
+
+            # The patterns loop independently of the progression; cycling iterators
+            # zipped with the symbols step them all together (rests included)
+            if inversions and octave_pattern:
+                inversion_cycle = itertools.cycle(inversions)
+                octave_cycle = itertools.cycle(octave_pattern)
+            else:
+                inversion_cycle = octave_cycle = itertools.repeat(0)
+
+            # Every loop of a part plays the same chords, so resolve each chord's
+            # duration and pitches once, then replay the list num_loops times
+            part_chords = [] # List of (duration, pitches); pitches is None for a rest
+            for chord_symbol, beats, inversion, oct_offset in zip(
+                part_chord_symbols, itertools.cycle(rhythm_beats), inversion_cycle, octave_cycle
+            ):
+                
+                duration = float(beats)
+                
+                if chord_symbol.upper() == "REST":
+                    part_chords.append((duration, None))
+                    continue
+                
+                part_chords.append((duration, get_chord_pitches(chord_symbol, base_octave, int(oct_offset), int(inversion))))
+
             for _ in range(num_loops):
-                for i, chord_symbol in enumerate(part_chord_symbols):
-                    
-                    if not part['rhythm_beats']: continue
-                    duration = float(part['rhythm_beats'][i % len(part['rhythm_beats'])])
+                for duration, pitches in part_chords:
                     
-                    if chord_symbol.upper() == "REST":
+                    if pitches is None:
                         current_time += duration
                         continue
                     
-                    if not part['inversions'] or not part['octave_pattern']:
-                        inversion = 0
-                        oct_offset = 0
-                    else:
-                        inversion = int(part['inversions'][i % len(part['inversions'])])
-                        oct_offset = int(part['octave_pattern'][i % len(part['octave_pattern'])])
-                    
-                    pitches = get_chord_pitches(chord_symbol, base_octave, oct_offset, inversion)
-                    
-                    play_style = part.get('play_style', 'block')
-                    
                     if play_style == 'arpeggio':
                         # (Add your arpeggio logic from main() here)
-                        note_objects = [
-                            Note(pitch=p, start_time=current_time, duration=duration * 0.9, velocity=85)
-                            for p in pitches
-                        ]
-                        chord_track.add_element(Chord(notes=note_objects))
+                        chord_track.add_block_chord(pitches, current_time, duration * 0.9, velocity=85)
                     else: 
-                        note_objects = [
-                            Note(pitch=p, start_time=current_time, duration=duration * 0.9, velocity=85)
-                            for p in pitches
-                        ]
-                        chord_track.add_element(Chord(notes=note_objects))
+                        chord_track.add_block_chord(pitches, current_time, duration * 0.9, velocity=85)
                     
                     current_time += duration
 
         song.add_track(chord_track)
 
-        # --- Export to a temporary file ---
+        # --- Stream the MIDI file as each track is encoded ---
+        # export_iter() checks the song before returning, so export errors
+        # still raise inside this try and get the JSON error response.
         exporter = MidiExporter(ticks_per_beat=480)
-        temp_file_handle, temp_file_path = tempfile.mkstemp(suffix='.mid')
-        os.close(temp_file_handle) 
-
-        try:
-            exporter.export(song, temp_file_path)
-            with open(temp_file_path, 'rb') as f:
-                file_buffer = io.BytesIO(f.read())
-        except Exception as e:
-            os.remove(temp_file_path)
-            raise e
-        finally:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-
-        file_buffer.seek(0)
-        
-        return send_file(
-            file_buffer,
-            as_attachment=True,
-            download_name=secure_filename(f"{global_settings.get('title', 'song')}.mid"),
-            mimetype='audio/midi'
-        )
+        download_name = secure_filename(f"{global_settings.get('title', 'song')}.mid")
+        midi_chunks = exporter.export_iter(song)
+
+        response = Response(stream_with_context(midi_chunks), mimetype='audio/midi')
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+        return response
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        return error_response(e)
 
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Development server only (see wsgi.py); set FLASK_DEBUG=1 for the debugger/reloader
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', port=5000)
\ No newline at end of file
@@ -1,24 +1,27 @@
-import io
-import random
-import tempfile
 import os
-from flask import Flask, request, jsonify, render_template, send_file
-from werkzeug.utils import secure_filename
+import traceback
+from functools import lru_cache
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+from werkzeug.utils import secure_filename as _secure_filename
 
 # --- Import from your existing script ---
 try:
     from modular_chord_generator import (
-        PITCH_MAP, NOTE_NAMES, SCALES, DIATONIC_QUALITIES, CHORD_VOICINGS,
+        PITCH_MAP, NOTE_NAMES, SCALES, DIATONIC_QUALITIES,
+        CHORD_SYMBOLS, VALID_QUALITIES,
         get_diatonic_chords, get_chord_pitches,
         midi_to_note_name  # <-- IMPORT YOUR NEW HELPER
     )
-    from modular_chord_generator import Note, Chord, Track, Composition, MidiExporter
+    from modular_chord_generator import Track, Composition, MidiExporter
 except ImportError as e:
     print(f"Error importing from modular_chord_generator.py: {e}")
     exit()
 
 app = Flask(__name__)
 
+# Users re-export the same few song titles, so memoize the filename sanitizing
+secure_filename = lru_cache(maxsize=1024)(_secure_filename)
+
 # ... (CHORD_PALETTE_RULES, @app.route('/'), @app.route('/get-chord-palette') are all unchanged) ...
 
 # (Make sure CHORD_PALETTE_RULES and your /get-chord-palette endpoint are still here)
@@ -62,9 +65,58 @@ CHORD_PALETTE_RULES = {
     ]
 }
 
+def error_response(e: Exception):
+    """
+    Builds a 500 JSON error response. The traceback is logged server-side and
+    only included in the response body when the app runs in debug mode.
+    """
+    app.logger.exception("Request failed")
+    payload = {"error": str(e)}
+    if app.debug:
+        payload["trace"] = traceback.format_exc()
+    return jsonify(payload), 500
+
+
+@lru_cache(maxsize=1)
+def render_index() -> str:
+    # index.html has no template variables, so it only needs rendering once
+    return render_template('index.html')
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    if app.debug: return render_template('index.html') # Pick up template edits while developing
+    return render_index()
+
+def build_chord_palette(key: str, scale: str) -> list[dict]:
+    root_val = PITCH_MAP[key]
+    intervals = SCALES[scale]
+    qualities = DIATONIC_QUALITIES[scale]
+    palette = []
+    for i in range(7):
+        note_val = (root_val + intervals[i]) % 12
+        root_name = NOTE_NAMES[note_val]
+        base_quality = qualities[i]
+        degree_info = { "degree": i + 1, "root": root_name, "base_quality": base_quality, "options": [] }
+        rules = CHORD_PALETTE_RULES.get(base_quality, [{'symbol_suffix': base_quality, 'type': 'diatonic'}])
+        seen_symbols = set()
+        for rule in rules:
+            if rule['symbol_suffix'] in VALID_QUALITIES:
+                 full_symbol = CHORD_SYMBOLS[(root_name, rule['symbol_suffix'])]
+                 degree_info['options'].append({ "symbol": full_symbol, "type": rule['type'] })
+                 seen_symbols.add(full_symbol)
+        base_chord_symbol = CHORD_SYMBOLS[(root_name, base_quality)]
+        if base_chord_symbol not in seen_symbols and base_quality in VALID_QUALITIES:
+             degree_info['options'].insert(0, { "symbol": base_chord_symbol, "type": "diatonic" })
+        palette.append(degree_info)
+    return palette
+
+# Every (key, scale) palette is serialized once at import; requests are a dict lookup.
+# The route upper-cases the key, so only the NOTE_NAMES spellings can ever match.
+# Compact separators, as jsonify uses (app.json.dumps alone keeps json's spaced ones).
+PALETTE_CACHE = {
+    (key, scale): app.json.dumps(build_chord_palette(key, scale), separators=(',', ':'))
+    for key in NOTE_NAMES for scale in SCALES if scale in DIATONIC_QUALITIES
+}
 
 @app.route('/get-chord-palette')
 def api_get_chord_palette():
@@ -73,29 +125,35 @@ def api_get_chord_palette():
     scale = request.args.get('scale')
     if not key or not scale: return jsonify({"error": "Missing 'key' or 'scale' parameter"}), 400
     if scale not in SCALES or scale not in DIATONIC_QUALITIES: return jsonify({"error": f"Invalid scale type: {scale}"}), 400
-    try:
-        root_val = PITCH_MAP[key.upper()]
-        intervals = SCALES[scale]
-        qualities = DIATONIC_QUALITIES[scale]
-        palette = []
-        for i in range(7):
-            note_val = (root_val + intervals[i]) % 12
-            root_name = NOTE_NAMES[note_val]
-            base_quality = qualities[i]
-            degree_info = { "degree": i + 1, "root": root_name, "base_quality": base_quality, "options": [] }
-            rules = CHORD_PALETTE_RULES.get(base_quality, [{'symbol_suffix': base_quality, 'type': 'diatonic'}])
-            for rule in rules:
-                full_symbol = f"{root_name}{rule['symbol_suffix']}"
-                if rule['symbol_suffix'] in CHORD_VOICINGS:
-                     degree_info['options'].append({ "symbol": full_symbol, "type": rule['type'] })
-            base_chord_symbol = f"{root_name}{base_quality}"
-            if not any(opt['symbol'] == base_chord_symbol for opt in degree_info['options']) and base_quality in CHORD_VOICINGS:
-                 degree_info['options'].insert(0, { "symbol": base_chord_symbol, "type": "diatonic" })
-            palette.append(degree_info)
-        return jsonify(palette)
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    body = PALETTE_CACHE.get((key.upper(), scale))
+    if body is None: return jsonify({"error": f"Invalid key: {key}"}), 400
+    return Response(body, mimetype='application/json')
+
+
+@lru_cache(maxsize=1024)
+def build_chord_data(symbol: str, base_octave: int, inversion: int) -> str:
+    """
+    Builds the serialized pitch/note-name JSON payload for a chord. Only depends on
+    (symbol, base_octave, inversion), so the encoded body is memoized as-is.
+    """
+    # Get the raw MIDI pitches
+    pitches = get_chord_pitches(
+        chord_symbol=symbol,
+        base_octave=base_octave,
+        octave_offset=0, # Octave offset is now handled by note-level edits
+        inversion=inversion
+    )
+    
+    # Convert pitches to note names
+    note_names = [midi_to_note_name(p) for p in pitches]
+    
+    # Compact separators, as for PALETTE_CACHE
+    return app.json.dumps({
+        "symbol": symbol,
+        "pitches": pitches,
+        "note_names": note_names,
+        "inversion": inversion
+    }, separators=(',', ':'))
 
 
 ### --- ADD THIS NEW ENDPOINT --- ###
@@ -112,27 +170,63 @@ def api_get_chord_data():
         return jsonify({"error": "Missing 'symbol' parameter"}), 400
         
     try:
-        # Get the raw MIDI pitches
-        pitches = get_chord_pitches(
-            chord_symbol=symbol,
-            base_octave=base_octave,
-            octave_offset=0, # Octave offset is now handled by note-level edits
-            inversion=inversion
-        )
+        return Response(build_chord_data(symbol, base_octave, inversion), mimetype='application/json')
         
-        # Convert pitches to note names
-        note_names = [midi_to_note_name(p) for p in pitches]
+    except Exception as e:
+        return error_response(e)
+
+
+def parse_song_settings(raw_settings) -> dict:
+    """
+    Validates and converts the request's 'settings' object in one pass, so the
+    handler works with typed values instead of scattered .get()/int() calls.
+    Raises ValueError with a client-facing message on malformed input.
+    """
+    if raw_settings is None:
+        raw_settings = {}
+    if not isinstance(raw_settings, dict):
+        raise ValueError("'settings' must be a JSON object")
+    
+    try:
+        return {
+            "title": str(raw_settings.get('title', 'Generated Song')),
+            "tempo": int(raw_settings.get('tempo', 120)),
+            "instrument": int(raw_settings.get('instrument', 50)),
+            "volume": int(raw_settings.get('volume', 90)),
+            "download_name": secure_filename(f"{raw_settings.get('title', 'song')}.mid"),
+        }
+    except (TypeError, ValueError):
+        raise ValueError("'tempo', 'instrument' and 'volume' settings must be integers")
+
+
+def expand_progression(progression_data: list[dict]) -> list[tuple[list[int], float, float]]:
+    """
+    Flattens the request's parts/loops/blocks into (pitches, start_time, duration)
+    events. Each part's blocks are parsed and filtered once, then replayed for
+    every loop, so the per-loop work is just time accumulation.
+    """
+    events = []
+    current_time = 0.0
+    
+    # Loop through the parts and their blocks
+    for part in progression_data:
+        num_loops = int(part.get('num_loops', 1))
         
-        return jsonify({
-            "symbol": symbol,
-            "pitches": pitches,
-            "note_names": note_names,
-            "inversion": inversion
-        })
+        blocks = []
+        for block in part.get('blocks', []):
+            pitches = block.get('pitches', [])
+            duration = float(block.get('duration', 0))
+            if not pitches or duration <= 0:
+                continue # Skip rests or empty blocks
+            blocks.append((pitches, duration))
         
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        for _ in range(num_loops):
+            for pitches, duration in blocks:
+                events.append((pitches, current_time, duration))
+                # Advance time for the next block
+                current_time += duration
+    
+    return events
 
 
 ### --- COMPLETELY REPLACED FUNCTION --- ###
@@ -143,90 +237,59 @@ def api_generate_midi():
     This is much simpler and more powerful than the old method.
     """
     try:
-        song_data = request.json
+        song_data = request.get_json(silent=True)
+        if not isinstance(song_data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+
         # This is the new, simpler data structure we expect
         progression_data = song_data.get('progression')
-        global_settings = song_data.get('settings')
 
         if not progression_data:
             return jsonify({"error": "No 'progression' data in request"}), 400
 
+        try:
+            settings = parse_song_settings(song_data.get('settings'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         song = Composition(
-            title=global_settings.get('title', 'Generated Song'),
-            tempo=int(global_settings.get('tempo', 120)),
+            title=settings['title'],
+            tempo=settings['tempo'],
             time_signature=(4, 4) # Hard-coded for now
         )
         
         chord_track = Track(
             name="Chord Progression",
-            instrument_program=int(global_settings.get('instrument', 50)),
+            instrument_program=settings['instrument'],
             channel=0,
-            volume=int(global_settings.get('volume', 90))
+            volume=settings['volume']
         )
         
-        current_time = 0.0
-        
-        # Loop through the parts and their blocks
-        for part in progression_data:
-            num_loops = int(part.get('num_loops', 1))
-            
-            for _ in range(num_loops):
-                # Loop through the actual chord blocks in this part
-                for block in part.get('blocks', []):
-                    
-                    pitches = block.get('pitches', [])
-                    duration = float(block.get('duration', 0))
-                    
-                    if not pitches or duration <= 0:
-                        continue # Skip rests or empty blocks
-                    
-                    # Create the chord (as block notes)
-                    note_objects = [
-                        Note(
-                            pitch=p,
-                            start_time=current_time,
-                            duration=duration * 0.9, # 90%
-                            velocity=85
-                        )
-                        for p in pitches
-                    ]
-                    chord_track.add_element(Chord(notes=note_objects))
-                    
-                    # Advance time for the next block
-                    current_time += duration
+        for pitches, start_time, duration in expand_progression(progression_data):
+            # Create the chord (as block notes)
+            chord_track.add_block_chord(
+                pitches,
+                start_time=start_time,
+                duration=duration * 0.9, # 90%
+                velocity=85
+            )
 
         song.add_track(chord_track)
 
-        # --- Export to a temporary file (this logic is unchanged) ---
+        # --- Stream the MIDI file as each track is encoded ---
+        # export_iter() checks the song before returning, so export errors
+        # still raise inside this try and get the JSON error response.
         exporter = MidiExporter(ticks_per_beat=480)
-        temp_file_handle, temp_file_path = tempfile.mkstemp(suffix='.mid')
-        os.close(temp_file_handle) 
+        midi_chunks = exporter.export_iter(song)
 
-        try:
-            exporter.export(song, temp_file_path)
-            with open(temp_file_path, 'rb') as f:
-                file_buffer = io.BytesIO(f.read())
-        except Exception as e:
-            os.remove(temp_file_path)
-            raise e
-        finally:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-
-        file_buffer.seek(0)
-        
-        return send_file(
-            file_buffer,
-            as_attachment=True,
-            download_name=secure_filename(f"{global_settings.get('title', 'song')}.mid"),
-            mimetype='audio/midi'
-        )
+        response = Response(stream_with_context(midi_chunks), mimetype='audio/midi')
+        response.headers.set('Content-Disposition', 'attachment', filename=settings['download_name'])
+        return response
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        return error_response(e)
 
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Development server only (see wsgi.py); set FLASK_DEBUG=1 for the debugger/reloader
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', port=5000)
\ No newline at end of file
@@ -1,24 +1,17 @@
 # modular_chord_generator.py
 
 import random
-from music_elements import Note, Chord
+from functools import lru_cache
+from music_elements import Note
 from track import Track
 from composition import Composition
 from midi_exporter import MidiExporter
+from music_theory import PITCH_MAP, NOTE_NAMES
 
 # ----------------------------------------------------------------------
 # %% --- Music Theory Definitions ---
 # ----------------------------------------------------------------------
 
-# Maps note names to their base MIDI pitch value (Octave 0)
-PITCH_MAP = {
-    'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4, 'F': 5,
-    'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11
-}
-
-# 12-tone note names (preferring sharps for simplicity)
-NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-
 # Scale definitions (intervals in semitones)
 SCALES = {
     'major': [0, 2, 4, 5, 7, 9, 11],
@@ -28,53 +21,53 @@ SCALES = {
 
 # Diatonic chord qualities for each scale degree (1-7)
 DIATONIC_QUALITIES = {
-    'major': ['maj', 'min', 'min', 'maj', 'maj7', 'min', 'dim'], # V is dom7
+    'major': ['maj', 'min', 'min', 'maj', 'dom7', 'min', 'dim'], # V is dom7
     'minor_natural': ['min', 'dim', 'maj', 'min', 'min', 'maj', 'maj'],
-    'minor_harmonic': ['min', 'dim', 'maj(aug)', 'min', 'maj7', 'maj', 'dim'] # V is dom7
+    'minor_harmonic': ['min', 'dim', 'maj(aug)', 'min', 'dom7', 'maj', 'dim'] # V is dom7
 }
 
 # Simple triad/seventh voicings (intervals from root)
+# Tuples, so the shared voicings can't be mutated by a caller
 CHORD_VOICINGS = {
-    'maj': [0, 4, 7],
-    'min': [0, 3, 7],
-    'dim': [0, 3, 6],
-    'maj(aug)': [0, 4, 8], # Augmented
-    'maj7': [0, 4, 7, 11],
-    'min7': [0, 3, 7, 10],
-    'maj7': [0, 4, 7, 10], # Dominant 7th
-    'min7b5': [0, 3, 6, 10]
+    'maj': (0, 4, 7),
+    'min': (0, 3, 7),
+    'dim': (0, 3, 6),
+    'maj(aug)': (0, 4, 8), # Augmented
+    'maj7': (0, 4, 7, 11),
+    'min7': (0, 3, 7, 10),
+    'dom7': (0, 4, 7, 10), # Dominant 7th
+    'min7b5': (0, 3, 6, 10)
 }
 
 # ----------------------------------------------------------------------
 # %% --- Helper Functions ---
 # ----------------------------------------------------------------------
 
-def get_diatonic_chords(root_name: str, scale_type: str) -> list[str]:
+@lru_cache(maxsize=64)
+def get_diatonic_chords(root_name: str, scale_type: str) -> tuple[str, ...]:
     """
     Generates the 7 diatonic chord symbols for a given key and scale.
-    e.g., ('C', 'major') -> ['Cmaj', 'Dmin', 'Emin', 'Fmaj', 'Gmaj7', 'Amin', 'Bdim']
+    e.g., ('C', 'major') -> ('Cmaj', 'Dmin', 'Emin', 'Fmaj', 'Gdom7', 'Amin', 'Bdim')
+    Memoized per (key, scale), since every part of a song asks again.
     """
     if scale_type not in SCALES or scale_type not in DIATONIC_QUALITIES:
         raise ValueError(f"Scale type '{scale_type}' not defined.")
         
     root_val = PITCH_MAP[root_name.upper()]
-    intervals = SCALES[scale_type]
-    qualities = DIATONIC_QUALITIES[scale_type]
     
-    chords = []
-    for i in range(7):
-        note_val = (root_val + intervals[i]) % 12
-        note_name = NOTE_NAMES[note_val]
-        quality = qualities[i]
-        chords.append(f"{note_name}{quality}")
-        
-    return chords
+    # One pass over (interval, quality) pairs, no per-degree indexing
+    return tuple(
+        NOTE_NAMES[(root_val + interval) % 12] + quality
+        for interval, quality in zip(SCALES[scale_type], DIATONIC_QUALITIES[scale_type])
+    )
 
 
-def get_chord_pitches(chord_symbol: str, base_octave: int, octave_offset: int = 0, inversion: int = 0) -> list[int]:
+@lru_cache(maxsize=4096)
+def get_chord_pitches(chord_symbol: str, base_octave: int, octave_offset: int = 0, inversion: int = 0) -> tuple[int, ...]:
     """
-    Converts a chord symbol into a list of MIDI pitches, applying octave and inversion.
-    e.g., ('Cmaj', 4, 0, 1) -> [64, 67, 72] (1st inversion)
+    Converts a chord symbol into a tuple of MIDI pitches, applying octave and inversion.
+    e.g., ('Cmaj', 4, 0, 1) -> (64, 67, 72) (1st inversion)
+    Results are memoized, since a song reuses a small set of chords many times.
     """
     # 1. Parse Symbol
     if len(chord_symbol) > 1 and (chord_symbol[1] == '#' or chord_symbol[1] == 'b'):
@@ -91,20 +84,20 @@ def get_chord_pitches(chord_symbol: str, base_octave: int, octave_offset: int =
     if root_name not in PITCH_MAP:
         raise ValueError(f"Root note '{root_name}' not in PITCH_MAP.")
 
-    # 2. Get root position pitches
-    root_pitch = PITCH_MAP[root_name] + ((base_octave + octave_offset) * 12)
     intervals = CHORD_VOICINGS[quality]
-    pitches = [root_pitch + i for i in intervals]
-    
-    # 3. Apply Inversions
-    for i in range(inversion):
-        if not pitches:
-            break
-        # Take the lowest note, move it up an octave
-        bass_note = pitches.pop(0)
-        pitches.append(bass_note + 12)
+    if not intervals:
+        return ()
+
+    # 2. Get pitches, applying inversions
+    # Each inversion takes the lowest note and moves it up an octave. Every
+    # len(intervals) inversions that lifts the whole chord an octave, and the
+    # remainder is a rotation, so build the result with one slice.
+    octaves_up, rotation = divmod(inversion, len(intervals)) if inversion > 0 else (0, 0)
+    root_pitch = PITCH_MAP[root_name] + ((base_octave + octave_offset + octaves_up) * 12)
+    pitches = [root_pitch + i for i in intervals[rotation:]]
+    pitches.extend(root_pitch + i + 12 for i in intervals[:rotation])
         
-    return pitches
+    return tuple(pitches)
 
 
 # ----------------------------------------------------------------------
@@ -231,11 +224,7 @@ def main():
                             arp_time += note_duration
                 
                 else: # Default to 'block'
-                    note_objects = [
-                        Note(pitch=p, start_time=current_time, duration=duration, velocity=85)
-                        for p in pitches
-                    ]
-                    chord_track.add_element(Chord(notes=note_objects))
+                    chord_track.add_block_chord(pitches, current_time, duration, velocity=85)
                 
                 # Advance time
                 current_time += duration
@@ -11,6 +11,7 @@ class Composition:
 
         self.title = title
         self.tracks: list[Track] = []
+        self._used_channels: set[int] = set() # Mirrors the tracks' channels for O(1) lookups in add_track
         self.tempo = tempo  # Beats Per Minute (BPM)
         self.time_signature = time_signature # e.g., (4, 4)
         # self.key_signature: str | None = None # Optional, can be added later
@@ -21,10 +22,11 @@ class Composition:
         # Ensure unique track channels if automatically assigning or managing
         # For now, we assume channels are managed by the user when creating Tracks
         # or could be assigned sequentially here if desired.
-        if any(t.channel == track.channel for t in self.tracks):
+        if track.channel in self._used_channels:
             # This is a simple check. A more robust system might auto-assign
             # or provide more detailed warnings/errors.
             print(f"Warning: Channel {track.channel} is already in use by another track.")
+        self._used_channels.add(track.channel)
         self.tracks.append(track)
 
     def set_tempo(self, tempo: int):
@@ -1,6 +1,7 @@
 # drum_patterns.py
 
-from music_elements import Note
+from itertools import compress
+from operator import itemgetter
 from track import Track
 
 # General MIDI Drum Map (common sounds, all on Channel 9 (0-indexed))
@@ -48,6 +49,7 @@ def create_drum_track_from_pattern(
                   A value > 0 in the list means a hit with that velocity,
                   0 or None means no hit.
                   Example: {'kick': [100, 0, 0, 0, 100, 0, 0, 0, ...], 'snare': [0,0,0,0,100,0,0,0,...]}
+                  A bytes/bytearray or array('B') with one byte per slot works too (e.g. bytes([100, 0, 0, 0, ...])).
         measures: Number of times to repeat the one-measure pattern.
         beats_per_measure: Typically 4 for 4/4 time.
         subdivisions_per_beat: How many slots per beat (e.g., 4 for 16th notes).
@@ -60,43 +62,56 @@ def create_drum_track_from_pattern(
     if not (0 <= default_velocity <= 127):
         raise ValueError("Default velocity must be between 0 and 127.")
 
-    drum_track = Track(name=name, instrument_program=0, channel=DRUM_CHANNEL) # Program change is often ignored for drums
-                                                                            # Channel 9 is key.
-    
     total_subdivisions_per_measure = beats_per_measure * subdivisions_per_beat
     time_per_subdivision = 1.0 / subdivisions_per_beat # In beats
 
-    for measure in range(measures):
-        measure_start_time = measure * beats_per_measure
-        for drum_name, pattern_list in patterns.items():
-            if drum_name not in GM_DRUM_MAP:
-                print(f"Warning: Drum name '{drum_name}' not found in GM_DRUM_MAP. Skipping.")
-                continue
-            
-            pitch = GM_DRUM_MAP[drum_name]
+    # Every measure repeats the same pattern, so decode each drum's hits
+    # (pitch, beat offset within the measure, velocity) once up front
+    measure_hits = []
+    for drum_name, pattern_list in patterns.items():
+        if drum_name not in GM_DRUM_MAP:
+            print(f"Warning: Drum name '{drum_name}' not found in GM_DRUM_MAP. Skipping.")
+            continue
+        
+        pitch = GM_DRUM_MAP[drum_name]
 
-            if len(pattern_list) != total_subdivisions_per_measure:
-                raise ValueError(
-                    f"Pattern length for '{drum_name}' ({len(pattern_list)}) "
-                    f"does not match total subdivisions per measure ({total_subdivisions_per_measure})."
-                )
+        if len(pattern_list) != total_subdivisions_per_measure:
+            raise ValueError(
+                f"Pattern length for '{drum_name}' ({len(pattern_list)}) "
+                f"does not match total subdivisions per measure ({total_subdivisions_per_measure})."
+            )
 
-            for i, hit_velocity_marker in enumerate(pattern_list):
-                if hit_velocity_marker and hit_velocity_marker > 0:
-                    current_beat_in_measure = i / subdivisions_per_beat
-                    start_time = measure_start_time + current_beat_in_measure
-                    
-                    velocity = default_velocity
-                    if isinstance(hit_velocity_marker, (int, float)) and hit_velocity_marker > 1:
-                        # Allow pattern to specify velocity directly if > 1
-                        velocity = min(127, int(hit_velocity_marker)) 
-                    
-                    note = Note(
-                        pitch=pitch,
-                        start_time=start_time,
-                        duration=note_duration,
-                        velocity=velocity
-                    )
-                    drum_track.add_element(note)
-    
-    return drum_track
\ No newline at end of file
+        # compress() skips the empty (0/None) slots in C, so only the hits are visited
+        for i in compress(range(total_subdivisions_per_measure), pattern_list):
+            hit_velocity_marker = pattern_list[i]
+            if hit_velocity_marker > 0:
+                current_beat_in_measure = i / subdivisions_per_beat
+                
+                velocity = default_velocity
+                if isinstance(hit_velocity_marker, (int, float)) and hit_velocity_marker > 1:
+                    # Allow pattern to specify velocity directly if > 1
+                    velocity = min(127, int(hit_velocity_marker)) 
+                
+                measure_hits.append((pitch, current_beat_in_measure, velocity))
+
+    # Put each measure's hits in time order (a stable sort, so hits on the same
+    # slot keep the patterns' lane order). Measures follow one another, so the
+    # expanded columns come out already sorted by start time.
+    measure_hits.sort(key=itemgetter(1))
+
+    # Expand the hits over every measure as whole columns and build the track from them
+    hit_pitches = [pitch for pitch, _, _ in measure_hits]
+    hit_velocities = [velocity for _, _, velocity in measure_hits]
+    return Track.from_pattern_array(
+        name,
+        pitches=hit_pitches * measures,
+        start_times=[
+            measure * beats_per_measure + current_beat_in_measure
+            for measure in range(measures)
+            for _, current_beat_in_measure, _ in measure_hits
+        ],
+        durations=[note_duration] * (len(measure_hits) * measures),
+        velocities=hit_velocities * measures,
+        instrument_program=0, # Program change is often ignored for drums
+        channel=DRUM_CHANNEL # Channel 9 is key.
+    )
\ No newline at end of file
@@ -1,17 +1,17 @@
 # generative_music_creator.py
 
+import bisect
 import random
-from music_elements import Note, Chord, Rest
+from functools import lru_cache
+from music_elements import Rest
 from track import Track
 from composition import Composition
 from midi_exporter import MidiExporter
+from music_theory import PITCH_MAP
 
 # --- GLOBAL MAPPINGS ---
-# Maps note names to their MIDI pitch value in octave 0
-PITCH_MAP = {'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4, 'F': 5, 
-             'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11}
-
 # Defines scales as intervals from the root note (in semitones)
+# (strictly ascending and below 12, as for music_theory.SCALES)
 SCALES = {
     'major': [0, 2, 4, 5, 7, 9, 11],
     'minor_natural': [0, 2, 3, 5, 7, 8, 10],
@@ -83,8 +83,12 @@ SONG_CONFIG = {
 #======================================================================#
 
 
+@lru_cache(maxsize=64)
 def get_scale_notes(root_note_name, scale_type, octave_range):
-    """Generates a list of all valid MIDI pitches for a given scale and octave range."""
+    """
+    Generates a sorted tuple of all valid MIDI pitches for a given scale and octave range.
+    Memoized per (key, scale, range); octave_range must be a tuple so it's hashable.
+    """
     root_midi = PITCH_MAP[root_note_name.upper()]
     intervals = SCALES[scale_type]
     
@@ -93,7 +97,7 @@ def get_scale_notes(root_note_name, scale_type, octave_range):
         for interval in intervals:
             scale_notes.append(root_midi + (octave * 12) + interval)
             
-    return sorted(list(set(scale_notes)))
+    return tuple(scale_notes)
 
 def generate_melody_track(config, scale_notes, total_duration):
     """Generates a melody track based on a sequence of high-level actions."""
@@ -104,6 +108,13 @@ def generate_melody_track(config, scale_notes, total_duration):
     # Start the melody in the middle of the available notes
     current_scale_index = len(scale_notes) // 2 
 
+    # Loop-invariant lookups, bound once instead of on every step
+    rhythm_choices = cfg['rhythm_choices']
+    max_scale_index = len(scale_notes) - 1
+    choice = random.choice
+    randint = random.randint
+    add_note = track.add_note_fast
+
     for action in cfg['actions']:
         action_type = action[0]
         steps = action[1]
@@ -114,26 +125,32 @@ def generate_melody_track(config, scale_notes, total_duration):
 
             if action_type == 'WALK':
                 direction = action[2]
-                duration = random.choice(cfg['rhythm_choices'])
+                duration = choice(rhythm_choices)
                 
                 current_scale_index += direction
                 # Clamp index to stay within the list bounds
-                current_scale_index = max(0, min(len(scale_notes) - 1, current_scale_index))
+                if current_scale_index < 0:
+                    current_scale_index = 0
+                elif current_scale_index > max_scale_index:
+                    current_scale_index = max_scale_index
                 
                 pitch = scale_notes[current_scale_index]
-                track.add_element(Note(pitch, current_time, duration, velocity=random.randint(90, 115)))
+                add_note(pitch, current_time, duration, randint(90, 115))
                 current_time += duration
 
             elif action_type == 'JUMP':
                 max_jump = action[2]
-                duration = random.choice(cfg['rhythm_choices'])
+                duration = choice(rhythm_choices)
 
-                jump_amount = random.randint(-max_jump, max_jump)
+                jump_amount = randint(-max_jump, max_jump)
                 current_scale_index += jump_amount
-                current_scale_index = max(0, min(len(scale_notes) - 1, current_scale_index))
+                if current_scale_index < 0:
+                    current_scale_index = 0
+                elif current_scale_index > max_scale_index:
+                    current_scale_index = max_scale_index
 
                 pitch = scale_notes[current_scale_index]
-                track.add_element(Note(pitch, current_time, duration, velocity=random.randint(95, 120)))
+                add_note(pitch, current_time, duration, randint(95, 120))
                 current_time += duration
                 
             elif action_type == 'REST':
@@ -144,17 +161,17 @@ def generate_melody_track(config, scale_notes, total_duration):
     return track
 
 
-def generate_chord_and_bass_tracks(config, scale_notes, total_duration):
-    """Generates diatonic chords and a corresponding bassline."""
+def generate_chord_and_bass_tracks(config, scale_notes, chord_root_notes, total_duration):
+    """
+    Generates diatonic chords and a corresponding bassline.
+    chord_root_notes is the pool of chord roots (see main); the chords are voiced from scale_notes.
+    """
     chord_cfg = config['chords']
     bass_cfg = config['bass']
     
     chord_track = Track("Chords", chord_cfg['instrument_program'], chord_cfg['channel'], volume=chord_cfg['volume'])
     bass_track = Track("Bass", bass_cfg['instrument_program'], bass_cfg['channel'], volume=bass_cfg['volume'])
     
-    # Use a smaller pool of notes for the chord roots to keep them sounding grounded
-    chord_root_notes = get_scale_notes(config['key'], config['scale_type'], (chord_cfg['octave'], chord_cfg['octave']))
-    
     current_time = 0.0
     while current_time < total_duration:
         duration = chord_cfg['rhythm_beats']
@@ -165,29 +182,31 @@ def generate_chord_and_bass_tracks(config, scale_notes, total_duration):
         # 2. Build the chord notes using diatonic intervals (from the main scale_notes list)
         chord_pitches = []
         try:
-            # Find the root note in the full scale list to build the chord from
-            scale_start_index = scale_notes.index(chord_root_notes[root_note_index])
+            # Find the root note in the full scale list to build the chord from.
+            # scale_notes is sorted, so binary-search instead of scanning.
+            root_pitch = chord_root_notes[root_note_index]
+            scale_start_index = bisect.bisect_left(scale_notes, root_pitch)
+            if scale_start_index == len(scale_notes) or scale_notes[scale_start_index] != root_pitch:
+                raise ValueError(f"Chord root {root_pitch} is not in scale_notes.")
             for interval in chord_cfg['voicing_intervals']:
                 chord_pitches.append(scale_notes[scale_start_index + interval])
         except (ValueError, IndexError):
             # If we go out of bounds, just repeat the root note
             chord_pitches.append(chord_root_notes[root_note_index])
 
-        # 3. Create the Chord object
-        chord_notes = [Note(p, current_time, duration, velocity=80) for p in chord_pitches]
-        chord_track.add_element(Chord(notes=chord_notes))
+        # 3. Add the chord
+        chord_track.add_block_chord(chord_pitches, current_time, duration, velocity=80)
         
         # 4. Create the corresponding Bass notes
-        bass_root_pitch = chord_notes[0].pitch + (bass_cfg['octave_offset'] * 12)
+        bass_root_pitch = chord_pitches[0] + (bass_cfg['octave_offset'] * 12)
         for beat_offset in bass_cfg['rhythm_pattern']:
             if beat_offset < duration:
-                bass_note = Note(
-                    pitch=bass_root_pitch,
-                    start_time=current_time + beat_offset,
-                    duration=1, # simple duration, can be customized
-                    velocity=random.randint(85, 100)
+                bass_track.add_note_fast(
+                    bass_root_pitch,
+                    current_time + beat_offset,
+                    1, # simple duration, can be customized
+                    random.randint(85, 100)
                 )
-                bass_track.add_element(bass_note)
         
         current_time += duration
         
@@ -204,13 +223,16 @@ def main():
         SONG_CONFIG['scale_type'], 
         SONG_CONFIG['melody']['octave_range']
     )
+    # Use a smaller pool of notes for the chord roots to keep them sounding grounded
+    chord_octave = SONG_CONFIG['chords']['octave']
+    chord_root_notes = get_scale_notes(SONG_CONFIG['key'], SONG_CONFIG['scale_type'], (chord_octave, chord_octave))
     
     # 2. Generate Tracks
     print("Generating melody...")
     melody_track = generate_melody_track(SONG_CONFIG, all_scale_notes, SONG_CONFIG['duration_beats'])
     
     print("Generating chords and bassline...")
-    chord_track, bass_track = generate_chord_and_bass_tracks(SONG_CONFIG, all_scale_notes, SONG_CONFIG['duration_beats'])
+    chord_track, bass_track = generate_chord_and_bass_tracks(SONG_CONFIG, all_scale_notes, chord_root_notes, SONG_CONFIG['duration_beats'])
 
     # 3. Create Composition
     song = Composition(
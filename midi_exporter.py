@@ -1,32 +1,126 @@
 # midi_exporter.py
 
+import io
+import os
+import struct
+from math import isfinite
+from functools import lru_cache
+from operator import itemgetter
 import mido
+# mido's own chunk writers, so the output is byte-identical to MidiFile.save()
+from mido.midifiles.midifiles import encode_variable_int, write_chunk, write_track
 from composition import Composition # type: ignore
 from track import Track # type: ignore
 from music_elements import Note, Chord, Rest # type: ignore
 
+# Sort key for (absolute_tick_time, is_note_on, pitch, velocity) events: the tick alone
+_EVENT_TICK = itemgetter(0)
+
 class MidiExporter:
     def __init__(self, ticks_per_beat: int = 480):
         self.ticks_per_beat = ticks_per_beat
 
-    def export(self, composition: Composition, output_filepath: str):
+    def export(self, composition: Composition, output):
+        """
+        Writes the composition as a Type 1 MIDI file.
+
+        Args:
+            composition: The Composition to export.
+            output: A file path, or a writable binary file object (e.g. io.BytesIO)
+                    to write the MIDI data to without touching the disk.
+        """
         if not isinstance(composition, Composition):
             raise TypeError("Input must be a Composition object.")
-        if not output_filepath.lower().endswith(".mid"):
-            print(f"Warning: Output filepath '{output_filepath}' does not end with .mid. Appending .mid.")
-            output_filepath += ".mid"
+        is_path = isinstance(output, (str, os.PathLike))
+        if is_path:
+            output = os.fspath(output)
+            if not output.lower().endswith(".mid"):
+                print(f"Warning: Output filepath '{output}' does not end with .mid. Appending .mid.")
+                output += ".mid"
 
-        midi_file = mido.MidiFile(ticks_per_beat=self.ticks_per_beat, type=1) # Type 1 for multi-track
+        # Build every chunk before opening the file, so a bad composition raises without leaving a partial file
+        chunks = list(self.export_iter(composition))
+
+        try:
+            if is_path:
+                with open(output, 'wb') as f:
+                    f.writelines(chunks)
+                print(f"MIDI file saved to {output}")
+            else:
+                output.writelines(chunks)
+        except Exception as e:
+            print(f"Error saving MIDI file: {e}")
+
+    def export_iter(self, composition: Composition):
+        """
+        Returns an iterator over the composition as a Type 1 MIDI file in byte
+        chunks: the header, the meta track, then each track chunk as soon as it
+        has been encoded. Lets a caller (e.g. a streaming HTTP response) start
+        sending before the whole file exists, without holding it all in memory.
+
+        Everything that can fail is checked here, before the iterator is
+        returned: the composition, its meta track and every note time. Track
+        chunks are then encoded from already range-checked Track data, so a
+        stream that has started doesn't stop halfway with an error.
+        """
+        if not isinstance(composition, Composition):
+            raise TypeError("Input must be a Composition object.")
 
-        # Meta track (usually the first track) for tempo, time signature, etc.
+        # The header needs the track count up front, so filter invalid tracks first
+        track_objs = self._valid_tracks(composition)
+        for track_obj in track_objs:
+            self._check_note_times(track_obj)
+
+        header = io.BytesIO()
+        write_chunk(header, b'MThd', struct.pack('>hhh', 1, len(track_objs) + 1, self.ticks_per_beat))
+        meta_chunk = self._encode_meta_track(composition.title, composition.tempo, *composition.time_signature)
+        return self._iter_chunks(header.getvalue(), meta_chunk, track_objs)
+
+    def _iter_chunks(self, header: bytes, meta_chunk: bytes, track_objs: list[Track]):
+        yield header
+        yield meta_chunk
+        for track_obj in track_objs:
+            yield self._encode_track(track_obj)
+
+    @staticmethod
+    def _check_note_times(track_obj: Track):
+        """
+        Raises a ValueError if any note starts or lasts for a non-finite time.
+        Note and Track reject negative times, but inf and nan get past those
+        checks and would only fail when converted to ticks.
+        """
+        finite = all(map(isfinite, track_obj.note_starts)) and all(map(isfinite, track_obj.note_durations))
+        if finite:
+            for element in track_obj.elements:
+                if isinstance(element, Note) or (isinstance(element, Chord) and element.notes):
+                    if not (isfinite(element.start_time) and isfinite(element.duration)):
+                        finite = False
+                        break
+        if not finite:
+            raise ValueError(f"Track '{track_obj.name}' has a note with a non-finite start time or duration.")
+
+    @staticmethod
+    def _valid_tracks(composition: Composition) -> list[Track]:
+        track_objs = []
+        for track_obj in composition.tracks:
+            if not isinstance(track_obj, Track):
+                print(f"Skipping invalid object in composition.tracks: {track_obj}")
+                continue
+            track_objs.append(track_obj)
+        return track_objs
+
+    # The meta track and each track's setup messages depend only on a few plain values,
+    # so their encoded bytes are cached; re-exporting (or exporting variants of) a song skips mido for them.
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _encode_meta_track(title: str, tempo: float, numerator: int, denominator: int) -> bytes:
         meta_track = mido.MidiTrack()
-        midi_file.tracks.append(meta_track)
 
-        meta_track.append(mido.MetaMessage('track_name', name=composition.title, time=0))
-        meta_track.append(mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(composition.tempo), time=0))
+        meta_track.append(mido.MetaMessage('track_name', name=title, time=0))
+        meta_track.append(mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(tempo), time=0))
         meta_track.append(mido.MetaMessage('time_signature',
-                                          numerator=composition.time_signature[0],
-                                          denominator=composition.time_signature[1],
+                                          numerator=numerator,
+                                          denominator=denominator,
                                           clocks_per_click=24, # Standard
                                           notated_32nd_notes_per_beat=8, # Standard
                                           time=0))
@@ -34,76 +128,128 @@ class MidiExporter:
         # if composition.key_signature:
         #     meta_track.append(mido.MetaMessage('key_signature', key=composition.key_signature, time=0))
 
-
-        for track_obj in composition.tracks:
-            if not isinstance(track_obj, Track):
-                print(f"Skipping invalid object in composition.tracks: {track_obj}")
-                continue
-
-            mido_track = mido.MidiTrack()
-            midi_file.tracks.append(mido_track)
-
-            # Track-specific meta messages and initial setup messages
-            mido_track.append(mido.MetaMessage('track_name', name=track_obj.name, time=0))
-            mido_track.append(mido.Message('program_change', program=track_obj.instrument_program, channel=track_obj.channel, time=0))
-            mido_track.append(mido.Message('control_change', control=10, value=track_obj.pan, channel=track_obj.channel, time=0)) # Pan
-            mido_track.append(mido.Message('control_change', control=7, value=track_obj.volume, channel=track_obj.channel, time=0)) # Volume
-
-            # Collect all events with their absolute tick times
-            events = [] # List of (absolute_tick_time, mido_message)
-
-            for element in track_obj.elements:
-                start_ticks = int(element.start_time * self.ticks_per_beat)
-
-                if isinstance(element, Note):
-                    end_ticks = int((element.start_time + element.duration) * self.ticks_per_beat)
-                    events.append((start_ticks, mido.Message('note_on', note=element.pitch, velocity=element.velocity, channel=track_obj.channel)))
-                    events.append((end_ticks, mido.Message('note_off', note=element.pitch, velocity=0, channel=track_obj.channel)))
-                elif isinstance(element, Chord):
-                    # Assuming all notes in a chord share the same start_time and duration from the chord object perspective
-                    # or derived from its first note (as per current music_elements.Chord logic)
-                    chord_start_time = element.start_time
-                    chord_duration = element.duration
-                    if chord_start_time is None or chord_duration is None:
-                        print(f"Warning: Chord {element} in track '{track_obj.name}' has no notes or calculable start/duration. Skipping.")
-                        continue
-
-                    chord_start_ticks = int(chord_start_time * self.ticks_per_beat)
-                    chord_end_ticks = int((chord_start_time + chord_duration) * self.ticks_per_beat)
-
-                    for note_in_chord in element.notes:
-                        events.append((chord_start_ticks, mido.Message('note_on', note=note_in_chord.pitch, velocity=note_in_chord.velocity, channel=track_obj.channel)))
-                        events.append((chord_end_ticks, mido.Message('note_off', note=note_in_chord.pitch, velocity=0, channel=track_obj.channel)))
-                elif isinstance(element, Rest):
-                    # Rests are implicitly handled by the delta times between other events.
-                    # No direct MIDI message is needed for a Rest itself.
-                    pass
-
-            # Sort events by absolute time, then prioritize note_off if at the same time (helps with some players)
-            events.sort(key=lambda x: (x[0], 0 if x[1].type == 'note_off' else 1))
-
-            # Convert absolute times to delta times for Mido messages
-            last_tick_time = 0
-            for abs_time, msg in events:
-                delta_ticks = abs_time - last_tick_time
-                msg.time = delta_ticks
-                mido_track.append(msg)
-                last_tick_time = abs_time
-            
-            # Add an end of track meta message (optional but good practice)
-            # Ensure its delta time is calculated correctly based on the last event.
-            # If events is empty, time is 0. Otherwise, it's 0 if last_tick_time is the current time.
-            # Mido might handle this automatically if track is empty, but explicit is fine.
-            # We can set it to a small delta if needed to ensure it's after the last note_off.
-            end_of_track_delta = 0
-            if not events: # if track was empty except for initial messages
-                 mido_track.append(mido.MetaMessage('end_of_track', time=1)) # Small delay
+        chunk = io.BytesIO()
+        write_track(chunk, meta_track)
+        return chunk.getvalue()
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _encode_track_setup(name: str, program: int, channel: int, pan: int, volume: int) -> tuple[bytes, int | None]:
+        """Returns the track's setup events (all at delta time 0) and the running status they leave behind."""
+        data = bytearray()
+        setup_messages = [
+            mido.MetaMessage('track_name', name=name),
+            mido.Message('program_change', program=program, channel=channel),
+            mido.Message('control_change', control=10, value=pan, channel=channel), # Pan
+            mido.Message('control_change', control=7, value=volume, channel=channel), # Volume
+        ]
+        running_status = None
+        for msg in setup_messages:
+            msg_bytes = msg.bytes()
+            data.append(0)
+            if msg.is_meta:
+                data.extend(msg_bytes)
+                running_status = None
+            elif msg_bytes[0] == running_status:
+                data.extend(msg_bytes[1:])
             else:
-                 mido_track.append(mido.MetaMessage('end_of_track', time=0))
-
-
-        try:
-            midi_file.save(output_filepath)
-            print(f"MIDI file saved to {output_filepath}")
-        except Exception as e:
-            print(f"Error saving MIDI file: {e}")
\ No newline at end of file
+                data.extend(msg_bytes)
+                running_status = msg_bytes[0]
+        return bytes(data), running_status
+
+    def _encode_track(self, track_obj: Track) -> bytes:
+        """
+        Encodes one Track as a complete MTrk chunk.
+
+        Only the track name and setup messages go through mido. Note events are
+        written straight to bytes: Note and Track already range-check pitch,
+        velocity and channel, so building and validating a mido.Message per
+        event would only repeat that work. Running status is applied the same
+        way mido's writer does, so the output is byte-identical to MidiFile.save().
+        """
+        tpb = self.ticks_per_beat
+        channel = track_obj.channel
+
+        # Track-specific meta messages and initial setup messages
+        setup_bytes, running_status = self._encode_track_setup(
+            track_obj.name, track_obj.instrument_program, channel, track_obj.pan, track_obj.volume)
+        data = bytearray(setup_bytes)
+
+        # Collect note_on and note_off events with their absolute tick times, in two lists.
+        # Each list is sorted on its own and the two are merged below, rather than sorting
+        # one interleaved list of both. The second field is 0 for note_off and 1 for note_on.
+        note_ons = [] # List of (absolute_tick_time, 1, pitch, velocity)
+        note_offs = [] # List of (absolute_tick_time, 0, pitch, 0)
+        add_on = note_ons.append
+        add_off = note_offs.append
+        for element in track_obj.elements:
+            if isinstance(element, Note):
+                add_on((int(element.start_time * tpb), 1, element.pitch, element.velocity))
+                add_off((int((element.start_time + element.duration) * tpb), 0, element.pitch, 0))
+            elif isinstance(element, Chord):
+                # Assuming all notes in a chord share the same start_time and duration from the chord object perspective
+                # or derived from its first note (as per current music_elements.Chord logic)
+                chord_start_time = element.start_time
+                chord_duration = element.duration
+                if chord_start_time is None or chord_duration is None:
+                    print(f"Warning: Chord {element} in track '{track_obj.name}' has no notes or calculable start/duration. Skipping.")
+                    continue
+
+                start_tick = int(chord_start_time * tpb)
+                end_tick = int((chord_start_time + chord_duration) * tpb)
+                for note_in_chord in element.notes:
+                    add_on((start_tick, 1, note_in_chord.pitch, note_in_chord.velocity))
+                    add_off((end_tick, 0, note_in_chord.pitch, 0))
+            elif isinstance(element, Rest):
+                # Rests are implicitly handled by the delta times between other events.
+                # No direct MIDI message is needed for a Rest itself.
+                pass
+
+        # Notes stored as columns (Track.add_note_fast / add_block_chord) skip the element objects entirely.
+        # Visit them in start-time order, the order add_element would have kept them in.
+        starts = track_obj.note_starts
+        if starts:
+            pitches = track_obj.note_pitches
+            durations = track_obj.note_durations
+            velocities = track_obj.note_velocities
+            for i in sorted(range(len(starts)), key=starts.__getitem__):
+                start_time = starts[i]
+                add_on((int(start_time * tpb), 1, pitches[i], velocities[i]))
+                add_off((int((start_time + durations[i]) * tpb), 0, pitches[i], 0))
+
+        # Sort events by absolute time, then prioritize note_off if at the same time (helps with some players).
+        # Each list is sorted on its own (note_ons are mostly in order already, since elements
+        # and columns are visited by start time), then note_ons go after note_offs and a final
+        # stable sort by tick merges the two sorted runs in C; on equal ticks note_offs stay first.
+        # This orders events exactly as one stable sort on (tick, is_note_on) would.
+        note_ons.sort(key=_EVENT_TICK)
+        note_offs.sort(key=_EVENT_TICK)
+        events = note_offs
+        events.extend(note_ons)
+        events.sort(key=_EVENT_TICK)
+
+        # Write each event as a variable-length delta time followed by the message bytes
+        note_on_status = 0x90 | channel
+        note_off_status = 0x80 | channel
+        write_byte = data.append
+        last_tick_time = 0
+        for abs_time, is_note_on, pitch, velocity in events:
+            delta_ticks = abs_time - last_tick_time
+            if delta_ticks < 0x80:
+                write_byte(delta_ticks)
+            else:
+                data.extend(encode_variable_int(delta_ticks))
+            status = note_on_status if is_note_on else note_off_status
+            if status != running_status:
+                write_byte(status)
+                running_status = status
+            write_byte(pitch)
+            write_byte(velocity)
+            last_tick_time = abs_time
+
+        # End of track; an otherwise empty track gets a one-tick delay
+        data += b'\x01\xff\x2f\x00' if not note_ons else b'\x00\xff\x2f\x00'
+
+        chunk = io.BytesIO()
+        write_chunk(chunk, b'MTrk', data)
+        return chunk.getvalue()
@@ -1,10 +1,13 @@
 import random
+import sys
+from functools import lru_cache
+from itertools import cycle
 import tempfile  
 import os      
-from music_elements import Note, Chord
 from track import Track
 from composition import Composition
 from midi_exporter import MidiExporter
+from music_theory import PITCH_MAP, NOTE_NAMES
 
 
 
@@ -12,13 +15,6 @@ from midi_exporter import MidiExporter
 # %% --- Music Theory Definitions ---
 # ----------------------------------------------------------------------
 
-PITCH_MAP = {
-    'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4, 'F': 5,
-    'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11
-}
-
-NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-
 SCALES = {
     'major': [0, 2, 4, 5, 7, 9, 11],
     'minor_natural': [0, 2, 3, 5, 7, 8, 10],
@@ -36,39 +32,73 @@ DIATONIC_QUALITIES = {
 
 # More complex voicings (intervals from root)
 # The parser in get_chord_pitches will find the longest matching key
+# Tuples, so the shared voicings can't be mutated by a caller
 CHORD_VOICINGS = {
     # Triads
-    'maj': [0, 4, 7],
-    'min': [0, 3, 7],
-    'dim': [0, 3, 6],
-    'aug': [0, 4, 8],
-    'maj(aug)': [0, 4, 8], # Alias
-    'sus2': [0, 2, 7],
-    'sus4': [0, 5, 7],
+    'maj': (0, 4, 7),
+    'min': (0, 3, 7),
+    'dim': (0, 3, 6),
+    'aug': (0, 4, 8),
+    'maj(aug)': (0, 4, 8), # Alias
+    'sus2': (0, 2, 7),
+    'sus4': (0, 5, 7),
     
     # Sevenths
-    'maj7': [0, 4, 7, 11], # Major 7th
-    'dom7': [0, 4, 7, 10], # Dominant 7th
-    'min7': [0, 3, 7, 10],
-    'dim7': [0, 3, 6, 9],
-    'm7b5': [0, 3, 6, 10], # Half-diminished
-    'min(maj7)': [0, 3, 7, 11],
+    'maj7': (0, 4, 7, 11), # Major 7th
+    'dom7': (0, 4, 7, 10), # Dominant 7th
+    'min7': (0, 3, 7, 10),
+    'dim7': (0, 3, 6, 9),
+    'm7b5': (0, 3, 6, 10), # Half-diminished
+    'min(maj7)': (0, 3, 7, 11),
     
     # Extensions (common voicings)
-    'add9': [0, 4, 7, 14],
-    'min(add9)': [0, 3, 7, 14],
-    'maj9': [0, 4, 7, 11, 14],
-    'min9': [0, 3, 7, 10, 14],
-    'dom9': [0, 4, 7, 10, 14],
-    'dom13': [0, 4, 7, 10, 14, 21], # Omits 11th
-    'maj13': [0, 4, 7, 11, 14, 21], # Omits 11th
-    'min11': [0, 3, 7, 10, 14, 17],
+    'add9': (0, 4, 7, 14),
+    'min(add9)': (0, 3, 7, 14),
+    'maj9': (0, 4, 7, 11, 14),
+    'min9': (0, 3, 7, 10, 14),
+    'dom9': (0, 4, 7, 10, 14),
+    'dom13': (0, 4, 7, 10, 14, 21), # Omits 11th
+    'maj13': (0, 4, 7, 11, 14, 21), # Omits 11th
+    'min11': (0, 3, 7, 10, 14, 17),
     
     ### NEWLY ADDED VOICINGS ###
-    'dom7#9': [0, 4, 7, 10, 15],  # The "Hendrix Chord"
-    'dom7b9': [0, 4, 7, 10, 13],
-    'maj7#11': [0, 4, 7, 11, 18], # No 9
-    'min13': [0, 3, 7, 10, 14, 21]
+    'dom7#9': (0, 4, 7, 10, 15),  # The "Hendrix Chord"
+    'dom7b9': (0, 4, 7, 10, 13),
+    'maj7#11': (0, 4, 7, 11, 18), # No 9
+    'min13': (0, 3, 7, 10, 14, 21)
+}
+
+# Characters that extend a root note name to two characters (e.g., 'C#', 'Bb')
+ACCIDENTALS = frozenset('#b')
+
+# Every quality a chord symbol can be built from
+VALID_QUALITIES = frozenset(CHORD_VOICINGS)
+
+# Quality keys grouped by first character, longest first, so the parser's
+# longest-match search only tries the few keys that could possibly match.
+QUALITIES_BY_PREFIX = {
+    first_char: tuple(sorted((q for q in CHORD_VOICINGS if q[0] == first_char), key=len, reverse=True))
+    for first_char in {q[0] for q in CHORD_VOICINGS}
+}
+
+# Interned chord symbols for each (root, quality) pair, e.g. ('C', 'maj7') -> 'Cmaj7'.
+# Building a symbol is then a lookup instead of a new string per call.
+CHORD_SYMBOLS = {
+    (root_name, quality): sys.intern(root_name + quality)
+    for root_name in NOTE_NAMES
+    for quality in VALID_QUALITIES.union(*DIATONIC_QUALITIES.values())
+}
+
+# The 7 diatonic chord symbols for every (root pitch class, scale), e.g.
+# (0, 'major') -> ('Cmaj', 'Dmin', 'Emin', 'Fmaj', 'Gdom7', 'Amin', 'Bdim').
+# There are only 12 roots per scale, so get_diatonic_chords is a lookup.
+DIATONIC_CHORDS = {
+    (root_val, scale_type): tuple(
+        CHORD_SYMBOLS[(NOTE_NAMES[(root_val + interval) % 12], quality)]
+        for interval, quality in zip(SCALES[scale_type], DIATONIC_QUALITIES[scale_type])
+    )
+    for root_val in range(12)
+    for scale_type in SCALES if scale_type in DIATONIC_QUALITIES
 }
 
 # ----------------------------------------------------------------------
@@ -95,23 +125,17 @@ def get_diatonic_chords(root_name: str, scale_type: str) -> list[str]:
         raise ValueError(f"Scale type '{scale_type}' not defined.")
         
     root_val = PITCH_MAP[root_name.upper()]
-    intervals = SCALES[scale_type]
-    qualities = DIATONIC_QUALITIES[scale_type]
     
-    chords = []
-    for i in range(7):
-        note_val = (root_val + intervals[i]) % 12
-        note_name = NOTE_NAMES[note_val]
-        quality = qualities[i]
-        chords.append(f"{note_name}{quality}")
-        
-    return chords
+    # Precomputed at import; copied so callers can't alter the shared table
+    return list(DIATONIC_CHORDS[(root_val, scale_type)])
 
 
-def get_chord_pitches(chord_symbol: str, base_octave: int, octave_offset: int = 0, inversion: int = 0) -> list[int]:
+@lru_cache(maxsize=4096)
+def get_chord_pitches(chord_symbol: str, base_octave: int, octave_offset: int = 0, inversion: int = 0) -> tuple[int, ...]:
     """
-    Converts a chord symbol into a list of MIDI pitches, applying octave and inversion.
-    e.g., ('Cmaj', 4, 0, 1) -> [64, 67, 72] (1st inversion)
+    Converts a chord symbol into a tuple of MIDI pitches, applying octave and inversion.
+    e.g., ('Cmaj', 4, 0, 1) -> (64, 67, 72) (1st inversion)
+    Results are memoized, since a song reuses a small set of chords many times.
     """
     
     ### UPDATED PARSER ###
@@ -119,22 +143,22 @@ def get_chord_pitches(chord_symbol: str, base_octave: int, octave_offset: int =
     # quality string (e.g., 'min(maj7)') before falling back to 'min'.
     
     # 1. Parse Root
-    if len(chord_symbol) > 1 and (chord_symbol[1] == '#' or chord_symbol[1] == 'b'):
-        root_name = chord_symbol[0:2]
-        quality_str = chord_symbol[2:]
-    else:
-        root_name = chord_symbol[0]
-        quality_str = chord_symbol[1:]
+    # The root is two characters when followed by an accidental (C#, Bb), else one.
+    # chord_symbol[1:2] is '' for one-character symbols, which is never in the set.
+    root_len = 2 if chord_symbol[1:2] in ACCIDENTALS else 1
+    root_name = chord_symbol[:root_len]
+    quality_str = chord_symbol[root_len:]
         
-    if root_name not in PITCH_MAP:
+    root_offset = PITCH_MAP.get(root_name)
+    if root_offset is None:
         raise ValueError(f"Root note '{root_name}' not in PITCH_MAP.")
 
     # 2. Parse Quality
-    # Find the longest matching quality key in CHORD_VOICINGS
+    # Find the longest quality key in CHORD_VOICINGS that prefixes quality_str
     quality = None
-    for length in range(len(quality_str), 0, -1):
-        if quality_str[:length] in CHORD_VOICINGS:
-            quality = quality_str[:length]
+    for candidate in QUALITIES_BY_PREFIX.get(quality_str[:1], ()):
+        if quality_str.startswith(candidate):
+            quality = candidate
             # You could also parse alterations here (e.g., b9, #11)
             # but that requires a more complex interval system.
             # For now, we just match the main quality.
@@ -144,22 +168,32 @@ def get_chord_pitches(chord_symbol: str, base_octave: int, octave_offset: int =
         print(f"Warning: Quality '{quality_str}' not in CHORD_VOICINGS. Using 'maj'.")
         quality = 'maj'
         
-    # 3. Get root position pitches
-    root_pitch = PITCH_MAP[root_name] + ((base_octave + octave_offset) * 12)
+    # 3. Get root position intervals
     intervals = CHORD_VOICINGS[quality]
-    pitches = [root_pitch + i for i in intervals]
+    if not intervals:
+        return ()
     
     # 4. Apply Inversions
-    for i in range(inversion):
-        if not pitches:
-            break
-        # Take the lowest note, move it up an octave
-        bass_note = pitches.pop(0)
-        pitches.append(bass_note + 12)
+    # Each inversion takes the lowest note and moves it up an octave. Every
+    # len(intervals) inversions that lifts the whole chord an octave, and the
+    # remainder is a rotation, so build the result with one slice.
+    octaves_up, rotation = divmod(inversion, len(intervals)) if inversion > 0 else (0, 0)
+    root_pitch = root_offset + ((base_octave + octave_offset + octaves_up) * 12)
+    pitches = [root_pitch + i for i in intervals[rotation:]]
+    pitches.extend(root_pitch + i + 12 for i in intervals[:rotation])
         
-    return pitches
+    return tuple(pitches)
 
 
+@lru_cache(maxsize=256)
+def get_arpeggio_cycle(pitches: tuple[int, ...]) -> tuple[int, ...]:
+    """
+    Returns one up/down pass over a chord's pitches for arpeggiation.
+    e.g., for 4 pitches: 0, 1, 2, 3, 2, 1 -> (60, 64, 67, 71, 67, 64)
+    Memoized per chord, like get_chord_pitches.
+    """
+    return pitches + pitches[-2:0:-1]
+
 # ----------------------------------------------------------------------
 # %% --- Song Configuration ---
 # ----------------------------------------------------------------------
@@ -201,6 +235,7 @@ INSTRUMENT_PROGRAM = 50 # 50: Synth Strings 1
 CHANNEL = 0
 VOLUME = 90
 BASE_OCTAVE = 4 # The "home" octave for all parts
+VERBOSE = False # Set to True to print per-part progress while generating
 
 
 # ----------------------------------------------------------------------
@@ -229,25 +264,30 @@ def main():
     current_time = 0.0
     full_progression_symbols = []
     
-    print("Generating notes...")
+    if VERBOSE:
+        print("Generating notes...")
     
     for part in SONG_STRUCTURE:
         part_name = part['part_name']
-        print(f"--- Generating Part: {part_name} ---")
+        if VERBOSE:
+            print(f"--- Generating Part: {part_name} ---")
         
         # This list will hold the chord symbols for this part
         part_chord_symbols = []
 
         ### NEW LOGIC: Check for 'progression_symbols' first ###
         if 'progression_symbols' in part:
-            print(f"    Using specified chord symbols.")
+            if VERBOSE:
+                print(f"    Using specified chord symbols.")
             part_chord_symbols = part['progression_symbols']
             
         elif 'progression_degrees' in part:
-            print(f"    Using diatonic degrees for {part['key']} {part['scale_type']}.")
+            if VERBOSE:
+                print(f"    Using diatonic degrees for {part['key']} {part['scale_type']}.")
             try:
                 diatonic_chords = get_diatonic_chords(part['key'], part['scale_type'])
-                print(f"    Diatonic chords: {', '.join(diatonic_chords)}")
+                if VERBOSE:
+                    print(f"    Diatonic chords: {', '.join(diatonic_chords)}")
                 for degree in part['progression_degrees']:
                     if not (1 <= degree <= 7):
                         print(f"    Invalid degree {degree}, skipping.")
@@ -260,23 +300,39 @@ def main():
             print(f"    No 'progression_symbols' or 'progression_degrees' found for {part_name}. Skipping part.")
             continue
             
+        # zip() stops at its shortest input, so an empty pattern would silently drop
+        # the whole part. Without a rhythm there's nothing to play; an empty inversion
+        # or octave pattern just means root position in the base octave.
+        if not part['rhythm_beats']:
+            print(f"    Empty 'rhythm_beats' for {part_name}. Skipping part.")
+            continue
+        inversions = part['inversions'] or (0,)
+        octave_pattern = part['octave_pattern'] or (0,)
+
+        # An arpeggio needs note durations to cycle through; without any, play block chords
+        play_style = part['play_style']
+        if play_style == 'arpeggio' and not part['arpeggio_pattern']:
+            print(f"    Empty 'arpeggio_pattern' for {part_name}. Using block chords.")
+            play_style = 'block'
+
+        # Pair each chord with its step of the rhythm/inversion/octave patterns once;
+        # the patterns restart with every loop, so each loop replays the same pairing
+        part_steps = list(zip(
+            part_chord_symbols,
+            cycle(part['rhythm_beats']),
+            cycle(inversions),
+            cycle(octave_pattern)
+        ))
+
         # --- Loop through the part's progression ---
         for _ in range(part['num_loops']):
-            for i, chord_symbol in enumerate(part_chord_symbols):
-                
-                # ... inside the `for i, chord_symbol in enumerate(part_chord_symbols):` loop ...
-
-                # --- Get Chord Properties ---
-                duration = part['rhythm_beats'][i % len(part['rhythm_beats'])]
+            for chord_symbol, duration, inversion, oct_offset in part_steps:
                 
                 if chord_symbol == "REST":
                     current_time += duration  # Skip note generation, just add time
                     full_progression_symbols.append("REST")
                     continue  # Move to the next chord symbol
                 
-                inversion = part['inversions'][i % len(part['inversions'])]
-                oct_offset = part['octave_pattern'][i % len(part['octave_pattern'])]
-                
                 full_progression_symbols.append(chord_symbol)
                 
                 # --- Get Pitches ---
@@ -288,52 +344,30 @@ def main():
                 
                 
                 # --- Generate Notes based on Play Style ---
-                if part['play_style'] == 'arpeggio':
+                if play_style == 'arpeggio':
+                    if not pitches: continue
+
+                    arp_pitches = get_arpeggio_cycle(pitches)
+
                     arp_time = 0.0
-                    arp_pattern = part['arpeggio_pattern']
-                    arp_pattern_len = len(arp_pattern)
-                    pitches_len = len(pitches)
-                    if pitches_len == 0: continue
-
-                    note_index = 0
-                    while arp_time < duration:
-                        # Get duration for this arp note
-                        note_duration = arp_pattern[note_index % arp_pattern_len]
-                        
+                    for note_duration, pitch in zip(cycle(part['arpeggio_pattern']), cycle(arp_pitches)):
+                        if arp_time >= duration:
+                            break
                         if arp_time + note_duration > duration:
                             note_duration = duration - arp_time # Truncate
                         if note_duration <= 0:
                             break
-                            
-                        # Cycle through pitches (simple up/down)
-                        # e.g., for 4 pitches: 0, 1, 2, 3, 2, 1
-                        max_idx = pitches_len - 1
-                        total_cycle_len = max(1, max_idx * 2) # e.g., 4 pitches -> 6 steps (0,1,2,3,2,1)
-                        if total_cycle_len == 0:
-                            pitch_index = 0
-                        else:
-                            pos_in_cycle = note_index % total_cycle_len
-                            if pos_in_cycle > max_idx:
-                                pitch_index = max_idx - (pos_in_cycle - max_idx)
-                            else:
-                                pitch_index = pos_in_cycle
-                        
-                        note = Note(
-                            pitch=pitches[pitch_index],
-                            start_time=current_time + arp_time,
-                            duration=note_duration * 0.95, # Add separation
-                            velocity=random.randint(80, 100)
+
+                        chord_track.add_note_fast(
+                            pitch,
+                            current_time + arp_time,
+                            note_duration * 0.95, # Add separation
+                            random.randint(80, 100)
                         )
-                        chord_track.add_element(note)
                         arp_time += note_duration
-                        note_index += 1
                 
                 else: # Default to 'block'
-                    note_objects = [
-                        Note(pitch=p, start_time=current_time, duration=duration * 0.9, velocity=85)
-                        for p in pitches
-                    ]
-                    chord_track.add_element(Chord(notes=note_objects))
+                    chord_track.add_block_chord(pitches, current_time, duration * 0.9, velocity=85)
                 
                 # Advance time
                 current_time += duration
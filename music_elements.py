@@ -1,6 +1,10 @@
 # music_elements.py
 
+from bisect import insort
+
 class Note:
+    __slots__ = ('pitch', 'start_time', 'duration', 'velocity')
+
     def __init__(self, pitch: int, start_time: float, duration: float, velocity: int = 100):
         if not (0 <= pitch <= 127):
             raise ValueError("Pitch must be between 0 and 127.")
@@ -27,6 +31,8 @@ class Note:
         return self.start_time + self.duration
 
 class Chord:
+    __slots__ = ('_notes',)
+
     def __init__(self, notes: list[Note] = None):
         self._notes: list[Note] = []
         if notes:
@@ -45,12 +51,13 @@ class Chord:
             raise ValueError("Can only add Note objects to a Chord.")
         # Basic implementation: ensure all notes in a chord generally align in time if added this way
         # For simplicity, we'll assume a chord's properties are defined by its constituent notes
-        self._notes.append(note)
-        self._notes.sort(key=lambda n: n.pitch)
+        # The list is already sorted, so insert in place (after any equal pitches) instead of re-sorting
+        insort(self._notes, note, key=lambda n: n.pitch)
 
     def add_pitches(self, pitches: list[int], start_time: float, duration: float, velocity: int = 100):
-        for pitch in pitches:
-            self.add_note(Note(pitch, start_time, duration, velocity))
+        # Build every note first, then sort once rather than once per note
+        self._notes.extend([Note(pitch, start_time, duration, velocity) for pitch in pitches])
+        self._notes.sort(key=lambda n: n.pitch)
 
     @property
     def start_time(self) -> float | None:
@@ -77,6 +84,8 @@ class Chord:
 
 
 class Rest:
+    __slots__ = ('start_time', 'duration')
+
     def __init__(self, start_time: float, duration: float):
         if duration <= 0:
             raise ValueError("Duration must be positive.")
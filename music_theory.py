@@ -0,0 +1,31 @@
+# music_theory.py
+
+from types import MappingProxyType
+
+# ----------------------------------------------------------------------
+# %% --- Shared Music Theory Tables ---
+# ----------------------------------------------------------------------
+# One copy of the tables every generator used to redefine. They're read-only
+# (MappingProxyType / tuples) since they're shared between modules.
+
+# Maps note names to their base MIDI pitch value (Octave 0)
+PITCH_MAP = MappingProxyType({
+    'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4, 'F': 5,
+    'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11
+})
+
+# 12-tone note names (preferring sharps for simplicity)
+NOTE_NAMES = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+
+# Scale definitions (intervals in semitones) for the melody generators.
+# The chord generators keep their own diatonic subsets, keyed like their
+# DIATONIC_QUALITIES tables.
+# Each entry must be strictly ascending and below 12: the generators' get_scale_notes
+# rely on that to build their palettes already unique and sorted, with no set/sort pass.
+SCALES = MappingProxyType({
+    'major': (0, 2, 4, 5, 7, 9, 11),
+    'minor_natural': (0, 2, 3, 5, 7, 8, 10),
+    'minor_harmonic': (0, 2, 3, 5, 7, 8, 11),
+    'pentatonic_major': (0, 2, 4, 7, 9),
+    'pentatonic_minor': (0, 3, 5, 7, 10)
+})
@@ -9,87 +9,87 @@
 
 import random
 import math
-from music_elements import Note, Rest, Chord
+from functools import lru_cache
 from track import Track
 from composition import Composition
 from midi_exporter import MidiExporter
+from music_theory import PITCH_MAP
 from drum_patterns import create_drum_track_from_pattern 
 
 # ----------------------------------------------------------------------
 # %% --- Music Theory Definitions ---
 # ----------------------------------------------------------------------
 
-# Maps note names to their base MIDI pitch value (Octave 0)
-PITCH_MAP = {
-    'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4, 'F': 5,
-    'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11
-}
-
-# 12-tone note names (preferring sharps for simplicity)
-NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-
 # This is the core dictionary for your chord specification.
-# It maps a symbol to a list of intervals (in semitones).
+# It maps a symbol to a tuple of intervals (in semitones).
+# (Tuples: the table is read-only and shared by every chord lookup.)
 # Feel free to add any chord voicings you want here!
 CHORD_INTERVALS = {
     # Basic Triads
-    'maj': [0, 4, 7],
-    'm': [0, 3, 7],
-    'dim': [0, 3, 6],
-    'aug': [0, 4, 8],
-    'sus4': [0, 5, 7],
-    'sus2': [0, 2, 7],
+    'maj': (0, 4, 7),
+    'm': (0, 3, 7),
+    'dim': (0, 3, 6),
+    'aug': (0, 4, 8),
+    'sus4': (0, 5, 7),
+    'sus2': (0, 2, 7),
     
     # Sevenths
-    '7': [0, 4, 7, 10],         # Dominant 7th
-    'maj7': [0, 4, 7, 11],    # Major 7th
-    'm7': [0, 3, 7, 10],      # Minor 7th
-    'm7b5': [0, 3, 6, 10],    # Half-diminished
-    'dim7': [0, 3, 6, 9],     # Fully diminished
+    '7': (0, 4, 7, 10),         # Dominant 7th
+    'maj7': (0, 4, 7, 11),    # Major 7th
+    'm7': (0, 3, 7, 10),      # Minor 7th
+    'm7b5': (0, 3, 6, 10),    # Half-diminished
+    'dim7': (0, 3, 6, 9),     # Fully diminished
     
     # Extensions (Ninth)
-    '9': [0, 4, 7, 10, 14],       # Dominant 9
-    'm9': [0, 3, 7, 10, 14],      # Minor 9
-    'maj9': [0, 4, 7, 11, 14],    # Major 9
-    '7b9': [0, 4, 7, 10, 13],     # Dominant flat 9
-    '7#9': [0, 4, 7, 10, 15],     # Dominant sharp 9 (Hendrix chord)
+    '9': (0, 4, 7, 10, 14),       # Dominant 9
+    'm9': (0, 3, 7, 10, 14),      # Minor 9
+    'maj9': (0, 4, 7, 11, 14),    # Major 9
+    '7b9': (0, 4, 7, 10, 13),     # Dominant flat 9
+    '7#9': (0, 4, 7, 10, 15),     # Dominant sharp 9 (Hendrix chord)
 
     # Extensions (Eleventh & Thirteenth)
     # Note: 11s and 13s usually imply 7s and 9s.
-    '11': [0, 4, 7, 10, 14, 17],
-    '#11': [0, 4, 7, 11, 14, 18], # Lydian dominant
-    'm11': [0, 3, 7, 10, 14, 17],
-    '13': [0, 4, 7, 10, 14, 21],   # Dominant 13
-    'm13': [0, 3, 7, 10, 14, 21],  # Minor 13
+    '11': (0, 4, 7, 10, 14, 17),
+    '#11': (0, 4, 7, 11, 14, 18), # Lydian dominant
+    'm11': (0, 3, 7, 10, 14, 17),
+    '13': (0, 4, 7, 10, 14, 21),   # Dominant 13
+    'm13': (0, 3, 7, 10, 14, 21),  # Minor 13
     
     # Add chords
-    'add9': [0, 4, 7, 14],
-    'm(add9)': [0, 3, 7, 14],
+    'add9': (0, 4, 7, 14),
+    'm(add9)': (0, 3, 7, 14),
 }
 
 # ----------------------------------------------------------------------
 # %% --- Helper Functions ---
 # ----------------------------------------------------------------------
 
-def get_pitches_for_chord(root_name: str, quality: str, base_octave: int, inversion: int = 0) -> list[int]:
+@lru_cache(maxsize=512)
+def get_pitches_for_chord(root_name: str, quality: str, base_octave: int, inversion: int = 0) -> tuple[int, ...]:
     """
-    Converts a chord symbol (e.g., 'C#', 'm7b5', 4) into a list of MIDI pitches.
+    Converts a chord symbol (e.g., 'C#', 'm7b5', 4) into a tuple of MIDI pitches.
+    Results are memoized, since a progression repeats the same few chords.
     """
-    if root_name not in PITCH_MAP:
+    root_offset = PITCH_MAP.get(root_name)
+    if root_offset is None:
         raise ValueError(f"Root note '{root_name}' not in PITCH_MAP.")
     if quality not in CHORD_INTERVALS:
         raise ValueError(f"Chord quality '{quality}' not in CHORD_INTERVALS. Add it to the dictionary.")
         
-    root_pitch = PITCH_MAP[root_name] + (base_octave * 12)
-    pitches = [root_pitch + i for i in CHORD_INTERVALS[quality]]
-    
+    intervals = CHORD_INTERVALS[quality]
+    if not intervals:
+        return ()
+
     # Apply Inversions
-    for i in range(inversion):
-        if pitches:
-            bass_note = pitches.pop(0)
-            pitches.append(bass_note + 12) # Move bass note up one octave
+    # Each inversion moves the bass note up an octave. Every len(intervals) inversions
+    # lifts the whole chord an octave, and the remainder rotates it, so slice once
+    # instead of popping from the front of the list per inversion.
+    octaves_up, rotation = divmod(inversion, len(intervals)) if inversion > 0 else (0, 0)
+    root_pitch = root_offset + ((base_octave + octaves_up) * 12)
+    pitches = [root_pitch + i for i in intervals[rotation:]]
+    pitches.extend(root_pitch + i + 12 for i in intervals[:rotation]) # Moved bass notes, up one octave
             
-    return pitches
+    return tuple(pitches)
 
 
 def generate_polyrhythm_onsets(rhythms: list[int], cycle_duration_beats: float) -> list[float]:
@@ -97,18 +97,14 @@ def generate_polyrhythm_onsets(rhythms: list[int], cycle_duration_beats: float)
     "Flattens" multiple polyrhythms (e.g., [3, 2, 5]) into a single
     list of onset times in beats, all starting from 0.
     """
-    onsets = set()
-    
-    for num_hits in rhythms:
-        if num_hits <= 0:
-            continue
-            
-        step_duration = cycle_duration_beats / num_hits
-        for i in range(num_hits):
-            # Use round to avoid floating point precision issues at the boundaries
-            onsets.add(round(i * step_duration, 5))
-            
-    return sorted(list(onsets))
+    # One set comprehension builds and dedupes every onset in a single pass.
+    # Use round to avoid floating point precision issues at the boundaries.
+    onsets = {
+        round(i * (cycle_duration_beats / num_hits), 5)
+        for num_hits in rhythms if num_hits > 0
+        for i in range(num_hits)
+    }
+    return sorted(onsets)
 
 # ----------------------------------------------------------------------
 # %% --- Generator Configuration ---
@@ -170,6 +166,9 @@ CONFIG = {
     
     # Set to True to also generate a track of block chords for context.
     "ADD_BLOCK_CHORD_TRACK": True,
+
+    # Set to True to print each chord change while generating.
+    "VERBOSE": False,
 }
 
 # ----------------------------------------------------------------------
@@ -178,6 +177,7 @@ CONFIG = {
 
 def main():
     print(f"Generating polyrhythm harmony: '{CONFIG['title']}'")
+    verbose = CONFIG['VERBOSE']
 
     # 1. Setup Composition
     song = Composition(
@@ -224,92 +224,87 @@ def main():
         CONFIG["POLYRHYTHM_HITS"],
         cycle_beats
     )
-    print(f"Generated {':'.join(map(str, CONFIG['POLYRHYTHM_HITS']))} polyrhythm onsets "
-          f"per {cycle_beats} beats: {rhythmic_onsets_one_cycle}")
+    if verbose:
+        print(f"Generated {':'.join(map(str, CONFIG['POLYRHYTHM_HITS']))} polyrhythm onsets "
+              f"per {cycle_beats} beats: {rhythmic_onsets_one_cycle}")
 
     # 5. --- Main Generation Loop ---
     generated_note_count = 0
-    current_cycle = 0
     total_beats = CONFIG["total_duration_beats"]
     note_duration = CONFIG["MELODY_NOTE_DURATION"]
     
     # -- Harmony Progression State --
+    # Walk the progression once up front: each chord's (start, end, chord, pitches).
+    # The onset loop below then only steps an index forward at chord boundaries.
     progression = CONFIG['CHORD_PROGRESSION']
+    chord_windows = []
+    chord_start_time = 0.0
+    for chord in progression:
+        chord_end_time = chord_start_time + chord['duration_beats']
+        try:
+            pitches = get_pitches_for_chord(chord['chord'], chord['quality'], chord['octave'], chord['inversion'])
+        except Exception as e:
+            # Fail before generating anything rather than part-way through the song
+            print(f"Error parsing chord {chord}: {e}")
+            return
+        chord_windows.append((chord_start_time, chord_end_time, chord, pitches))
+        chord_start_time = chord_end_time
+
     progression_index = 0
-    current_chord = progression[progression_index]
-    current_chord_start_time = 0.0
-    current_chord_end_time = current_chord['duration_beats']
-    current_pitches = get_pitches_for_chord(
-        current_chord['chord'], current_chord['quality'],
-        current_chord['octave'], current_chord['inversion']
-    )
+    current_chord_start_time, current_chord_end_time, current_chord, current_pitches = chord_windows[0]
     
-    print(f"Beat 0.0: Starting with chord {current_chord['chord']}{current_chord['quality']} "
-          f"(Pitches: {current_pitches})")
+    if verbose:
+        print(f"Beat 0.0: Starting with chord {current_chord['chord']}{current_chord['quality']} "
+              f"(Pitches: {current_pitches})")
 
     # Add the first block chord
     if chord_pad_track:
-        chord_pad_track.add_element(Chord(notes=[
-            Note(p, current_chord_start_time, current_chord['duration_beats'], 80) for p in current_pitches
-        ]))
+        chord_pad_track.add_block_chord(current_pitches, current_chord_start_time, current_chord['duration_beats'], 80)
 
-    # Loop over each rhythmic cycle (e.g., each measure)
-    while (current_cycle * cycle_beats) < total_beats:
-        measure_start_time = current_cycle * cycle_beats
-        
-        # For each hit in our flattened rhythm...
-        for onset_in_cycle in rhythmic_onsets_one_cycle:
-            note_start_time = measure_start_time + onset_in_cycle
-            
-            if note_start_time >= total_beats:
-                break
-            
-            # --- Check if the chord has changed ---
-            if note_start_time >= current_chord_end_time:
-                progression_index += 1
-                if progression_index >= len(progression):
-                    print("Reached end of progression.")
-                    break # End of progression
-                
-                # Load the new chord
-                current_chord = progression[progression_index]
-                current_chord_start_time = current_chord_end_time
-                current_chord_end_time += current_chord['duration_beats']
-                
-                try:
-                    current_pitches = get_pitches_for_chord(
-                        current_chord['chord'], current_chord['quality'],
-                        current_chord['octave'], current_chord['inversion']
-                    )
-                    print(f"Beat {current_chord_start_time}: Changing to chord "
-                          f"{current_chord['chord']}{current_chord['quality']} (Pitches: {current_pitches})")
-                    
-                    # Add the block chord for this new section
-                    if chord_pad_track:
-                        chord_pad_track.add_element(Chord(notes=[
-                            Note(p, current_chord_start_time, current_chord['duration_beats'], 80) for p in current_pitches
-                        ]))
-                        
-                except Exception as e:
-                    print(f"Error parsing chord {current_chord}: {e}")
-                    break
-            
-            # --- Select a note from the active chord ---
-            if not current_pitches:
-                continue # Skip if chord has no pitches
+    # Per-onset calls, bound once outside the loop
+    choose_pitch = random.choice
+    randint = random.randint
+    add_melody_note = melody_track.add_note_fast
 
-            pitch = random.choice(current_pitches)
-            velocity = random.randint(90, 115)
+    # The whole piece's onset schedule: each rhythmic cycle (e.g., each measure)
+    # repeats the flattened rhythm from its own start. The cycle count gets one
+    # spare for float rounding; the filter drops every hit at or past total_beats.
+    onset_times = [
+        measure_start_time + onset_in_cycle
+        for measure_start_time in (cycle * cycle_beats for cycle in range(math.ceil(total_beats / cycle_beats) + 1))
+        for onset_in_cycle in rhythmic_onsets_one_cycle
+        if measure_start_time + onset_in_cycle < total_beats
+    ]
+
+    # For each hit in our flattened rhythm...
+    for note_start_time in onset_times:
+        # --- Check if the chord has changed ---
+        if note_start_time >= current_chord_end_time:
+            progression_index += 1
+            if progression_index >= len(chord_windows):
+                if verbose:
+                    print("Reached end of progression.")
+                break # End of progression
             
-            melody_track.add_element(Note(
-                pitch=pitch,
-                start_time=note_start_time,
-                duration=note_duration,
-                velocity=velocity
-            ))
-            generated_note_count += 1
+            # Load the new chord
+            current_chord_start_time, current_chord_end_time, current_chord, current_pitches = chord_windows[progression_index]
+            if verbose:
+                print(f"Beat {current_chord_start_time}: Changing to chord "
+                      f"{current_chord['chord']}{current_chord['quality']} (Pitches: {current_pitches})")
             
-        current_cycle += 1
+            # Add the block chord for this new section
+            if chord_pad_track:
+                chord_pad_track.add_block_chord(current_pitches, current_chord_start_time, current_chord['duration_beats'], 80)
+        
+        # --- Select a note from the active chord ---
+        if not current_pitches:
+            continue # Skip if chord has no pitches
+
+        pitch = choose_pitch(current_pitches)
+        velocity = randint(90, 115)
+        
+        add_melody_note(pitch, note_start_time, note_duration, velocity)
+        generated_note_count += 1
 
     # 6. Finalize and export
     song.add_track(melody_track)
@@ -1,11 +1,13 @@
 # polyrhythm_melody_generator.py
 
+import heapq
 import random
 import math
-from music_elements import Note, Rest
+from functools import lru_cache
 from track import Track
 from composition import Composition
 from midi_exporter import MidiExporter
+from music_theory import PITCH_MAP, SCALES
 # Import the drum pattern creator to add context
 from drum_patterns import create_drum_track_from_pattern 
 
@@ -13,26 +15,15 @@ from drum_patterns import create_drum_track_from_pattern
 # %% --- Music Theory Definitions ---
 # ----------------------------------------------------------------------
 
-# (PITCH_MAP and SCALES are copied from random_melody_generator.py)
-PITCH_MAP = {
-    'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4, 'F': 5,
-    'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11
-}
-
-SCALES = {
-    'major': [0, 2, 4, 5, 7, 9, 11],
-    'minor_natural': [0, 2, 3, 5, 7, 8, 10],
-    'minor_harmonic': [0, 2, 3, 5, 7, 8, 11],
-    'pentatonic_major': [0, 2, 4, 7, 9],
-    'pentatonic_minor': [0, 3, 5, 7, 10]
-}
+# (PITCH_MAP and SCALES are shared with the other generators via music_theory.py)
 
 # ----------------------------------------------------------------------
 # %% --- Helper Functions ---
 # ----------------------------------------------------------------------
 
 # (Copied from random_melody_generator.py)
-def get_scale_notes(root_note_name: str, scale_type: str, min_octave: int, max_octave: int) -> list[int]:
+@lru_cache(maxsize=64)
+def get_scale_notes(root_note_name: str, scale_type: str, min_octave: int, max_octave: int) -> tuple[int, ...]:
     if scale_type not in SCALES:
         raise ValueError(f"Scale type '{scale_type}' not defined.")
     root_midi = PITCH_MAP[root_note_name.upper()]
@@ -43,7 +34,7 @@ def get_scale_notes(root_note_name: str, scale_type: str, min_octave: int, max_o
             pitch = root_midi + (octave * 12) + interval
             if 0 <= pitch <= 127:
                 note_palette.append(pitch)
-    return sorted(list(set(note_palette)))
+    return tuple(note_palette)
 
 # ----------------------------------------------------------------------
 # %% --- NEW: Polyrhythm Logic ---
@@ -59,20 +50,19 @@ def generate_polyrhythm_onsets(r1_hits: int, r2_hits: int, cycle_duration_beats:
              - 2 hits at: 0.0, 2.0
              - Returns: [0.0, 1.33, 2.0, 2.66]
     """
-    onsets = set()
-    
-    # Calculate onsets for rhythm 1
+    # Use round to avoid floating point precision issues at the boundaries.
     r1_step = cycle_duration_beats / r1_hits
-    for i in range(r1_hits):
-        # Use round to avoid floating point precision issues at the boundaries
-        onsets.add(round(i * r1_step, 5))
-        
-    # Calculate onsets for rhythm 2
     r2_step = cycle_duration_beats / r2_hits
-    for i in range(r2_hits):
-        onsets.add(round(i * r2_step, 5))
-        
-    return sorted(list(onsets))
+    r1_onsets = [round(i * r1_step, 5) for i in range(r1_hits)]
+    r2_onsets = [round(i * r2_step, 5) for i in range(r2_hits)]
+
+    if math.gcd(r1_hits, r2_hits) == 1:
+        # Coprime rhythms (3:2, 5:4, 7:3...) only meet on the downbeat, so both
+        # lists are already sorted and disjoint apart from 0.0: just merge them
+        return list(heapq.merge(r1_onsets, r2_onsets[1:]))
+
+    # Otherwise the rhythms share hits; a set merges them before sorting
+    return sorted(set(r1_onsets).union(r2_onsets))
 
 # ----------------------------------------------------------------------
 # %% --- Generator Configuration ---
@@ -168,37 +158,38 @@ def main():
     max_step = CONFIG["max_step_size"]
     total_beats = CONFIG["total_duration_beats"]
     
-    current_cycle = 0
     generated_note_count = 0
+
+    # Per-note lookups, bound once outside the loop
+    max_scale_index = len(note_palette) - 1
+    randint = random.randint
+    add_melody_note = melody_track.add_note_fast
     
-    # Loop over each cycle (e.g., each measure)
-    while (current_cycle * cycle_beats) < total_beats:
-        measure_start_time = current_cycle * cycle_beats
+    # The whole song's onset schedule: each cycle (e.g., each measure) repeats the
+    # flattened rhythm from its own start. The cycle count gets one spare for float
+    # rounding; the filter stops at the total song duration.
+    onset_times = [
+        measure_start_time + onset_in_cycle
+        for measure_start_time in (cycle * cycle_beats for cycle in range(math.ceil(total_beats / cycle_beats) + 1))
+        for onset_in_cycle in rhythmic_onsets_one_cycle
+        if measure_start_time + onset_in_cycle < total_beats
+    ]
+
+    # For each hit in our flattened rhythm...
+    for note_start_time in onset_times:
+        # Get pitch using the random walk logic
+        # (clamped at every step, so each note depends on where the last one ended up)
+        current_scale_index += randint(-max_step, max_step)
+        if current_scale_index < 0:
+            current_scale_index = 0
+        elif current_scale_index > max_scale_index:
+            current_scale_index = max_scale_index
+        pitch = note_palette[current_scale_index]
         
-        # For each hit in our flattened rhythm...
-        for onset_in_cycle in rhythmic_onsets_one_cycle:
-            note_start_time = measure_start_time + onset_in_cycle
-            
-            # Stop if we go over the total song duration
-            if note_start_time >= total_beats:
-                break
-                
-            # Get pitch using the random walk logic
-            step = random.randint(-max_step, max_step)
-            current_scale_index = max(0, min(len(note_palette) - 1, current_scale_index + step))
-            pitch = note_palette[current_scale_index]
-            
-            # Create the note
-            velocity = random.randint(90, 115)
-            melody_track.add_element(Note(
-                pitch=pitch,
-                start_time=note_start_time,
-                duration=note_duration,
-                velocity=velocity
-            ))
-            generated_note_count += 1
-            
-        current_cycle += 1
+        # Create the note
+        velocity = randint(90, 115)
+        add_melody_note(pitch, note_start_time, note_duration, velocity)
+        generated_note_count += 1
 
     # 4. Finalize and export
     song.add_track(melody_track)
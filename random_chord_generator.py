@@ -1,24 +1,18 @@
 # random_chord_generator.py
 
 import random
-from music_elements import Note, Chord
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate, cycle
 from track import Track
 from composition import Composition
 from midi_exporter import MidiExporter
+from music_theory import PITCH_MAP, NOTE_NAMES
 
 # ----------------------------------------------------------------------
 # %% --- Music Theory Definitions ---
 # ----------------------------------------------------------------------
 
-# Maps note names to their base MIDI pitch value (Octave 0)
-PITCH_MAP = {
-    'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4, 'F': 5,
-    'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11
-}
-
-# 12-tone note names (preferring sharps for simplicity)
-NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-
 # Scale definitions (intervals in semitones)
 SCALES = {
     'major': [0, 2, 4, 5, 7, 9, 11],
@@ -27,22 +21,23 @@ SCALES = {
 
 # Diatonic chord qualities for each scale degree (1-7)
 DIATONIC_QUALITIES = {
-    'major': ['maj', 'min', 'min', 'maj', 'maj7', 'min', 'dim'], # V is dom7
+    'major': ['maj', 'min', 'min', 'maj', 'dom7', 'min', 'dim'], # V is dom7
     'minor_natural': ['min', 'dim', 'maj', 'min', 'min', 'maj', 'maj']
 }
 
 # Chord voicings (intervals from root)
 CHORD_VOICINGS = {
-    'maj': [0, 4, 7], 'min': [0, 3, 7], 'dim': [0, 3, 6],
-    'maj7': [0, 4, 7, 10], # Dominant 7th
+    'maj': (0, 4, 7), 'min': (0, 3, 7), 'dim': (0, 3, 6),
+    'dom7': (0, 4, 7, 10), # Dominant 7th
 }
 
 # ----------------------------------------------------------------------
 # %% --- Helper Functions ---
 # ----------------------------------------------------------------------
 
-def get_diatonic_chords(root_name: str, scale_type: str) -> list[str]:
-    """Generates the 7 diatonic chord symbols for a given key and scale."""
+@lru_cache(maxsize=64)
+def get_diatonic_chords(root_name: str, scale_type: str) -> tuple[str, ...]:
+    """Generates the 7 diatonic chord symbols for a given key and scale (memoized)."""
     root_val = PITCH_MAP[root_name.upper()]
     intervals = SCALES[scale_type]
     qualities = DIATONIC_QUALITIES[scale_type]
@@ -51,10 +46,11 @@ def get_diatonic_chords(root_name: str, scale_type: str) -> list[str]:
         note_val = (root_val + intervals[i]) % 12
         note_name = NOTE_NAMES[note_val]
         chords.append(f"{note_name}{qualities[i]}")
-    return chords
+    return tuple(chords)
 
-def get_chord_pitches(chord_symbol: str, base_octave: int, inversion: int = 0) -> list[int]:
-    """Converts a chord symbol into a list of MIDI pitches, applying inversion."""
+@lru_cache(maxsize=1024)
+def get_chord_pitches(chord_symbol: str, base_octave: int, inversion: int = 0) -> tuple[int, ...]:
+    """Converts a chord symbol into a tuple of MIDI pitches, applying inversion (memoized)."""
     if len(chord_symbol) > 1 and (chord_symbol[1] == '#' or chord_symbol[1] == 'b'):
         root_name = chord_symbol[0:2]
         quality = chord_symbol[2:]
@@ -64,14 +60,35 @@ def get_chord_pitches(chord_symbol: str, base_octave: int, inversion: int = 0) -
     if quality not in CHORD_VOICINGS:
         quality = 'maj'
     
-    root_pitch = PITCH_MAP[root_name] + (base_octave * 12)
-    pitches = [root_pitch + i for i in CHORD_VOICINGS[quality]]
+    intervals = CHORD_VOICINGS[quality]
+    if not intervals:
+        return ()
     
-    for i in range(inversion):
-        if pitches:
-            bass_note = pitches.pop(0)
-            pitches.append(bass_note + 12)
-    return pitches
+    # Whole octaves for every full cycle of inversions, then rotate the remainder
+    octaves_up, rotation = divmod(inversion, len(intervals)) if inversion > 0 else (0, 0)
+    root_pitch = PITCH_MAP[root_name] + ((base_octave + octaves_up) * 12)
+    pitches = [root_pitch + i for i in intervals[rotation:]]
+    pitches.extend(root_pitch + i + 12 for i in intervals[:rotation])
+    return tuple(pitches)
+
+@lru_cache(maxsize=64)
+def get_arpeggio_layout(arp_pattern: tuple[float, ...], duration: float) -> tuple[tuple[float, float], ...]:
+    """
+    Lays out one chord's arpeggio as (offset, note_duration) pairs, cycling
+    through arp_pattern and truncating the last note at duration (memoized).
+    """
+    layout = []
+    arp_time = 0.0
+    for note_duration in cycle(arp_pattern):
+        if arp_time >= duration:
+            break
+        if arp_time + note_duration > duration:
+            note_duration = duration - arp_time
+        if note_duration <= 0:
+            break
+        layout.append((arp_time, note_duration))
+        arp_time += note_duration
+    return tuple(layout)
 
 # ----------------------------------------------------------------------
 # %% --- Generator Configuration ---
@@ -119,7 +136,13 @@ def main():
     # 1. Set up diatonic chords and track
     try:
         diatonic_chords = get_diatonic_chords(CONFIG['key'], CONFIG['scale_type'])
-        degrees = list(range(1, 8)) # [1, 2, 3, 4, 5, 6, 7]
+        # Cumulative weights per degree (1-7), for a binary-search weighted draw
+        cum_weights = list(accumulate(CONFIG['chord_weights']))
+        if len(cum_weights) != len(diatonic_chords):
+            raise ValueError("chord_weights needs one weight per scale degree (7).")
+        total_weight = cum_weights[-1] + 0.0
+        if total_weight <= 0.0:
+            raise ValueError("chord_weights must add up to more than zero.")
         print(f"Diatonic chords in {CONFIG['key']} {CONFIG['scale_type']}: {', '.join(diatonic_chords)}")
     except Exception as e:
         print(f"Error setting up chords: {e}")
@@ -135,59 +158,56 @@ def main():
         time_signature=CONFIG['time_signature']
     )
 
-    # 2. Generate the chord sequence randomly
+    # 2. Lay out the chord timings
+    # Timing doesn't depend on the random draws, so cycle through the rhythm
+    # once up front, collecting (start_time, duration) for every chord.
+    total_beats = CONFIG['total_duration_beats']
+    chord_slots = []
     current_time = 0.0
-    rhythm_index = 0
-    generated_symbol_list = []
-
-    print("Generating notes...")
-    while current_time < CONFIG['total_duration_beats']:
-        # --- Determine duration for this chord ---
-        duration = CONFIG['rhythm_beats'][rhythm_index % len(CONFIG['rhythm_beats'])]
-        rhythm_index += 1
+    for duration in cycle(CONFIG['rhythm_beats']):
+        if current_time >= total_beats:
+            break
         # Ensure the final chord doesn't overshoot the total duration
-        if current_time + duration > CONFIG['total_duration_beats']:
-            duration = CONFIG['total_duration_beats'] - current_time
+        if current_time + duration > total_beats:
+            duration = total_beats - current_time
         if duration <= 0:
             break
+        chord_slots.append((current_time, duration))
+        current_time += duration
+
+    # 3. Generate the chord sequence randomly
+    generated_symbol_list = []
 
+    # Per-chord lookups and bound methods, set up once
+    last_degree_index = len(cum_weights) - 1
+    roll = random.random
+    randint = random.randint
+    use_random_inversions = CONFIG['use_random_inversions']
+    base_octave = CONFIG['base_octave']
+    arpeggiate = CONFIG['play_style'] == 'arpeggio'
+    arp_pattern = tuple(CONFIG['arpeggio_pattern'])
+    add_note = track.add_note_fast
+
+    print("Generating notes...")
+    for current_time, duration in chord_slots:
         # --- Randomly select a chord degree based on weights ---
-        chosen_degree = random.choices(degrees, weights=CONFIG['chord_weights'], k=1)[0]
-        chord_symbol = diatonic_chords[chosen_degree - 1]
+        # (the same draw random.choices makes, without its per-call list and checks)
+        chord_symbol = diatonic_chords[bisect_right(cum_weights, roll() * total_weight, 0, last_degree_index)]
         generated_symbol_list.append(chord_symbol)
 
         # --- Get pitches with optional random inversion ---
-        inversion = random.randint(0, 1) if CONFIG['use_random_inversions'] else 0
-        pitches = get_chord_pitches(chord_symbol, CONFIG['base_octave'], inversion)
+        inversion = randint(0, 1) if use_random_inversions else 0
+        pitches = get_chord_pitches(chord_symbol, base_octave, inversion)
         
         # --- Generate notes based on play style ---
-        if CONFIG['play_style'] == 'arpeggio':
-            arp_time = 0.0
-            arp_pattern = CONFIG['arpeggio_pattern']
-            note_index = 0
-            while arp_time < duration:
-                note_duration = arp_pattern[note_index % len(arp_pattern)]
-                if arp_time + note_duration > duration:
-                    note_duration = duration - arp_time
-                if note_duration <= 0:
-                    break
-                
-                pitch = pitches[note_index % len(pitches)]
-                track.add_element(Note(
-                    pitch=pitch,
-                    start_time=current_time + arp_time,
-                    duration=note_duration,
-                    velocity=random.randint(75, 95)
-                ))
-                arp_time += note_duration
-                note_index += 1
+        if arpeggiate:
+            # Most chords share a duration, so their layout comes from the cache
+            for (arp_time, note_duration), pitch in zip(get_arpeggio_layout(arp_pattern, duration), cycle(pitches)):
+                add_note(pitch, current_time + arp_time, note_duration, randint(75, 95))
         else: # Block chords
-            notes = [Note(p, current_time, duration, 85) for p in pitches]
-            track.add_element(Chord(notes=notes))
-
-        current_time += duration
+            track.add_block_chord(pitches, current_time, duration, velocity=85)
 
-    # 3. Finalize and export
+    # 4. Finalize and export
     song.add_track(track)
     
     print("=" * 40)
@@ -1,37 +1,28 @@
 # random_melody_generator.py
 
 import random
-from music_elements import Note, Rest
+from functools import lru_cache
+from music_elements import Rest
 from track import Track
 from composition import Composition
 from midi_exporter import MidiExporter
+from music_theory import PITCH_MAP, SCALES
 
 # ----------------------------------------------------------------------
 # %% --- Music Theory Definitions ---
 # ----------------------------------------------------------------------
 
-# Maps note names to their base MIDI pitch value (Octave 0)
-PITCH_MAP = {
-    'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4, 'F': 5,
-    'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11
-}
-
-# Scale definitions (intervals in semitones)
-SCALES = {
-    'major': [0, 2, 4, 5, 7, 9, 11],
-    'minor_natural': [0, 2, 3, 5, 7, 8, 10],
-    'minor_harmonic': [0, 2, 3, 5, 7, 8, 11],
-    'pentatonic_major': [0, 2, 4, 7, 9],
-    'pentatonic_minor': [0, 3, 5, 7, 10]
-}
+# (PITCH_MAP and SCALES are shared with the other generators via music_theory.py)
 
 # ----------------------------------------------------------------------
 # %% --- Helper Functions ---
 # ----------------------------------------------------------------------
 
-def get_scale_notes(root_note_name: str, scale_type: str, min_octave: int, max_octave: int) -> list[int]:
+@lru_cache(maxsize=64)
+def get_scale_notes(root_note_name: str, scale_type: str, min_octave: int, max_octave: int) -> tuple[int, ...]:
     """
-    Generates a sorted list of all valid MIDI pitches for a given scale and octave range.
+    Generates a sorted tuple of all valid MIDI pitches for a given scale and octave range.
+    Memoized per (key, scale, octaves); the tuple keeps the cached palette read-only.
     """
     if scale_type not in SCALES:
         raise ValueError(f"Scale type '{scale_type}' not defined.")
@@ -46,7 +37,7 @@ def get_scale_notes(root_note_name: str, scale_type: str, min_octave: int, max_o
             if 0 <= pitch <= 127: # Ensure valid MIDI range
                 note_palette.append(pitch)
             
-    return sorted(list(set(note_palette))) # Return unique, sorted pitches
+    return tuple(note_palette)
 
 # ----------------------------------------------------------------------
 # %% --- Generator Configuration ---
@@ -126,16 +117,28 @@ def main():
     current_time = 0.0
     # Start the melody in the middle of the available note palette
     current_scale_index = len(note_palette) // 2
+    max_scale_index = len(note_palette) - 1
     generated_note_count = 0
 
+    # Loop-invariant settings and bound methods, looked up once
+    total_beats = CONFIG['total_duration_beats']
+    rest_chance = CONFIG['rest_chance']
+    rest_duration_choices = CONFIG['rest_duration_choices']
+    rhythm_choices = CONFIG['rhythm_choices']
+    max_step = CONFIG['max_step_size']
+    roll = random.random
+    choice = random.choice
+    randint = random.randint
+    add_note = track.add_note_fast
+
     print("Generating notes...")
-    while current_time < CONFIG['total_duration_beats']:
+    while current_time < total_beats:
         
         # --- Check if this event should be a rest ---
-        if random.random() < CONFIG['rest_chance'] and current_time > 0:
-            duration = random.choice(CONFIG['rest_duration_choices'])
-            if current_time + duration > CONFIG['total_duration_beats']:
-                duration = CONFIG['total_duration_beats'] - current_time
+        if roll() < rest_chance and current_time > 0:
+            duration = choice(rest_duration_choices)
+            if current_time + duration > total_beats:
+                duration = total_beats - current_time
             if duration > 0:
                 track.add_element(Rest(start_time=current_time, duration=duration))
                 current_time += duration
@@ -144,30 +147,27 @@ def main():
         # --- If not a rest, generate a note ---
         
         # 1. Get rhythm
-        duration = random.choice(CONFIG['rhythm_choices'])
-        if current_time + duration > CONFIG['total_duration_beats']:
-            duration = CONFIG['total_duration_beats'] - current_time
+        duration = choice(rhythm_choices)
+        if current_time + duration > total_beats:
+            duration = total_beats - current_time
         if duration <= 0:
             break
 
         # 2. Get pitch (random walk)
-        step = random.randint(-CONFIG['max_step_size'], CONFIG['max_step_size'])
+        step = randint(-max_step, max_step)
         current_scale_index += step
         
         # Clamp the index to stay within the bounds of the note_palette
-        current_scale_index = max(0, min(len(note_palette) - 1, current_scale_index))
+        if current_scale_index < 0:
+            current_scale_index = 0
+        elif current_scale_index > max_scale_index:
+            current_scale_index = max_scale_index
         
         pitch = note_palette[current_scale_index]
 
-        # 3. Create Note
-        velocity = random.randint(85, 115)
-        note = Note(
-            pitch=pitch,
-            start_time=current_time,
-            duration=duration,
-            velocity=velocity
-        )
-        track.add_element(note)
+        # 3. Add the note (straight into the track's note columns, no Note object)
+        velocity = randint(85, 115)
+        add_note(pitch, current_time, duration, velocity)
         
         generated_note_count += 1
         current_time += duration
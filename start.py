@@ -20,44 +20,28 @@ current_scale_notes = scale(key_note, mode='major') # Get notes of C major scale
 # Let's generate a short melody using random notes from our C Major scale
 # and a predefined set of rhythms.
 
-melody_notes = []
 melody_durations = [1/4, 1/8, 1/8, 1/4, 1/2] # Beat durations (quarter, eighth, half)
 num_melody_notes = 8 # Let's create 8 notes for our melody
 
-for i in range(num_melody_notes):
-    # Randomly pick a note from the scale
-    # musicpy scales are 1-indexed for get_degree, or you can directly access .notes (0-indexed)
-    random_degree = random.randint(1, len(current_scale_notes))
-    note_pitch = current_scale_notes.get(str(random_degree)) # .get() can take degree strings
-
-    # For simplicity, let's use the first note object if get() returns a chord/list
-    if isinstance(note_pitch, (list, chord)):
-        note_pitch = note_pitch[0]
-
-    # Randomly pick a duration for this note
-    # We'll cycle through melody_durations for simplicity here
-    duration = melody_durations[i % len(melody_durations)]
-
-    # Create a musicpy note (pitch, duration)
-    # Note: musicpy's core note object is created via C(), N(), or note().
-    # For a sequence, we often build a chord object where each "note" in the chord
-    # is played sequentially.
-    # Let's make a single note chord for each melodic element.
-    # Note names like 'C4', 'D#5', 'Gb3' are directly usable.
-    # We can also adjust octave here if needed.
-    # Example: current_scale_notes.notes[random.randint(0, len(current_scale_notes.notes)-1)]
-    # The .get() method is convenient for scale degrees.
-
-    melodic_fragment = note_pitch % duration # Set duration for the note
-    melody_notes.append(melodic_fragment)
+# Randomly pick every note from the scale up front.
+# musicpy scales are 1-indexed for get(), but .notes is a plain 0-indexed list, so
+# index it directly instead of formatting a degree string for .get() on each note.
+scale_note_list = current_scale_notes.notes
+melody_degrees = [random.randrange(len(scale_note_list)) for _ in range(num_melody_notes)]
+
+# Give each note its duration, cycling through melody_durations for simplicity.
+# Note: musicpy's core note object is created via C(), N(), or note().
+# For a sequence, we build a chord object where each "note" is played sequentially,
+# so each melodic element is a single note with its duration set.
+melody_notes = [
+    scale_note_list[degree] % melody_durations[i % len(melody_durations)] # Set duration for the note
+    for i, degree in enumerate(melody_degrees)
+]
 
 # Combine the melodic fragments into a single 'chord' object (which represents a sequence here)
-# The `+` operator for chords in musicpy concatenates them sequentially.
-generative_melody = None
-if melody_notes:
-    generative_melody = melody_notes[0]
-    for i in range(1, len(melody_notes)):
-        generative_melody += melody_notes[i]
+# chord() takes the whole list of notes at once; chaining `+` would copy the
+# growing chord for every note added.
+generative_melody = chord(melody_notes) if melody_notes else None
 
 # You can print the generated melody to see its structure:
 # if generative_melody:
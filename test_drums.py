@@ -4,32 +4,32 @@ from composition import Composition
 from midi_exporter import MidiExporter
 from drum_patterns import create_drum_track_from_pattern, GM_DRUM_MAP
 
-def main():
-    # Define a 1-measure pattern for a 4/4 beat with 16th note subdivisions
-    # Each list has 4 beats * 4 subdivisions/beat = 16 slots
-    # Value '1' means hit with default_velocity.
-    # Value > 1 can mean specific velocity (e.g. 120).
-    # Value 0 or None means no hit.
-
-    basic_rock_pattern = {
-        'kick':       [120, 0, 0, 0,   0, 0, 0, 0,   110, 0, 0, 0,   0, 0, 0, 0], # Kick on 1 and 3
-        'snare':      [0, 0, 0, 0,   100, 0, 0, 0,   0, 0, 0, 0,   100, 0, 0, 0], # Snare on 2 and 4
-        'closed_hat': [90, 0, 90, 0,   90, 0, 90, 0,   90, 0, 90, 0,   90, 0, 90, 0], # Eighth note hi-hats
-        # 'open_hat':   [0, 0, 0, 0,   0, 0, 0, 0,   0, 0, 0, 0,   0, 0, 0, 70], # Open hat on the last 16th
-    }
-    
-    funky_pattern = {
-        'kick':       [120, 0, 80, 0,   0, 100, 0, 70,   110, 0, 0, 0,   0, 90, 0, 0],
-        'snare':      [0, 0, 0, 0,   100, 0, 0, 0,   0, 0, 0, 60,   100, 0, 0, 0],
-        'closed_hat': [90, 70, 90, 70,  90, 70, 90, 70,  90, 70, 90, 70,  90, 70, 90, 70],
-        'open_hat':   [0, 0, 0, 0,   0, 0, 0, 0,   0, 0, 0, 0,   0, 0, 0, 80],
-        'clap':       [0, 0, 0, 0,   100, 0, 0, 0,   0, 0, 0, 0,   100, 0, 0, 0], # Layer with snare
-    }
-
+# Define 1-measure patterns for a 4/4 beat with 16th note subdivisions
+# Each pattern has 4 beats * 4 subdivisions/beat = 16 slots
+# Value '1' means hit with default_velocity.
+# Value > 1 can mean specific velocity (e.g. 120).
+# Value 0 means no hit.
+# Patterns are bytes (one byte per slot, fixed at import) rather than lists of ints.
+
+BASIC_ROCK_PATTERN = {
+    'kick':       bytes((120, 0, 0, 0,   0, 0, 0, 0,   110, 0, 0, 0,   0, 0, 0, 0)), # Kick on 1 and 3
+    'snare':      bytes((0, 0, 0, 0,   100, 0, 0, 0,   0, 0, 0, 0,   100, 0, 0, 0)), # Snare on 2 and 4
+    'closed_hat': bytes((90, 0, 90, 0,   90, 0, 90, 0,   90, 0, 90, 0,   90, 0, 90, 0)), # Eighth note hi-hats
+    # 'open_hat':   bytes((0, 0, 0, 0,   0, 0, 0, 0,   0, 0, 0, 0,   0, 0, 0, 70)), # Open hat on the last 16th
+}
+
+FUNKY_PATTERN = {
+    'kick':       bytes((120, 0, 80, 0,   0, 100, 0, 70,   110, 0, 0, 0,   0, 90, 0, 0)),
+    'snare':      bytes((0, 0, 0, 0,   100, 0, 0, 0,   0, 0, 0, 60,   100, 0, 0, 0)),
+    'closed_hat': bytes((90, 70, 90, 70,  90, 70, 90, 70,  90, 70, 90, 70,  90, 70, 90, 70)),
+    'open_hat':   bytes((0, 0, 0, 0,   0, 0, 0, 0,   0, 0, 0, 0,   0, 0, 0, 80)),
+    'clap':       bytes((0, 0, 0, 0,   100, 0, 0, 0,   0, 0, 0, 0,   100, 0, 0, 0)), # Layer with snare
+}
 
+def main():
     # Create the drum track using the pattern, repeated for 4 measures
     # drum_track = create_drum_track_from_pattern(
-    #     patterns=basic_rock_pattern,
+    #     patterns=BASIC_ROCK_PATTERN,
     #     measures=4,
     #     beats_per_measure=4,
     #     subdivisions_per_beat=4, # 16th notes
@@ -38,7 +38,7 @@ def main():
 
     drum_track = create_drum_track_from_pattern(
         name="Funky Drums",
-        patterns=funky_pattern,
+        patterns=FUNKY_PATTERN,
         measures=8,
         beats_per_measure=4,
         subdivisions_per_beat=4,
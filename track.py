@@ -1,17 +1,39 @@
 # track.py
 
+from array import array
+from bisect import insort
+from itertools import repeat
+from operator import attrgetter
 from music_elements import Note, Chord, Rest # type: ignore # Add this if your linter complains before files are in same dir
 
+# Sort key for elements; attrgetter runs in C, unlike an equivalent lambda
+_START_TIME_KEY = attrgetter('start_time')
+
+def _check_track_settings(instrument_program: int, channel: int, pan: int, volume: int):
+    """Raises a ValueError naming the first Track setting that is out of range."""
+    if not (0 <= instrument_program <= 127):
+        raise ValueError("Instrument program must be between 0 and 127.")
+    if not (0 <= channel <= 15):
+        raise ValueError("MIDI channel must be between 0 and 15.")
+    if not (0 <= pan <= 127):
+        raise ValueError("Pan must be between 0 and 127.")
+    if not (0 <= volume <= 127):
+        raise ValueError("Volume must be between 0 and 127.")
+
 class Track:
+    __slots__ = (
+        'name', 'instrument_program', 'channel', 'elements', 'pan', 'volume',
+        'note_pitches', 'note_starts', 'note_durations', 'note_velocities',
+    )
+
     def __init__(self, name: str, instrument_program: int = 0, channel: int = 0, pan: int = 64, volume: int = 100):
-        if not (0 <= instrument_program <= 127):
-            raise ValueError("Instrument program must be between 0 and 127.")
-        if not (0 <= channel <= 15):
-            raise ValueError("MIDI channel must be between 0 and 15.")
-        if not (0 <= pan <= 127):
-            raise ValueError("Pan must be between 0 and 127.")
-        if not (0 <= volume <= 127):
-            raise ValueError("Volume must be between 0 and 127.")
+        # An int fits its MIDI range exactly when it has no bits set outside it
+        # (negative ints have every high bit set), so one combined test covers
+        # all four settings. Anything else (a failure, or non-int values such as
+        # floats) goes through the per-setting range checks.
+        if (not (type(instrument_program) is type(channel) is type(pan) is type(volume) is int)
+                or (instrument_program | pan | volume) & ~0x7F or channel & ~0x0F):
+            _check_track_settings(instrument_program, channel, pan, volume)
 
         self.name = name
         self.instrument_program = instrument_program
@@ -19,19 +41,118 @@ class Track:
         self.elements: list[Note | Chord | Rest] = []
         self.pan = pan # 0 (left) - 64 (center) - 127 (right)
         self.volume = volume # Track-level volume (often set by CC 7)
+        # Column storage for notes added with add_note_fast (one entry per note, no Note objects)
+        self.note_pitches = array('B')
+        self.note_starts = array('d')
+        self.note_durations = array('d')
+        self.note_velocities = array('B')
+
+    @classmethod
+    def from_pattern_array(cls, name: str, pitches, start_times, durations, velocities,
+                           instrument_program: int = 0, channel: int = 0, pan: int = 64, volume: int = 100) -> 'Track':
+        """
+        Builds a track straight from parallel note columns (e.g. an expanded
+        drum pattern), with no Note objects at any point. The columns are
+        given, validated and stored as in add_notes_fast.
+        """
+        track = cls(name, instrument_program, channel, pan, volume)
+        track.add_notes_fast(pitches, start_times, durations, velocities)
+        return track
 
     def add_element(self, element: Note | Chord | Rest):
         if not isinstance(element, (Note, Chord, Rest)):
             raise TypeError("Element must be a Note, Chord, or Rest object.")
-        self.elements.append(element)
-        # Keep elements sorted by start_time for easier processing later
-        self.elements.sort(key=lambda x: x.start_time)
+        # Keep elements sorted by start_time for easier processing later.
+        # Elements usually arrive in time order, so when this one starts no earlier
+        # than the current last element it simply goes on the end. Otherwise insert
+        # it in place (after any equal start times, where a stable sort would put it).
+        elements = self.elements
+        if not elements or element.start_time >= elements[-1].start_time:
+            elements.append(element)
+        else:
+            insort(elements, element, key=_START_TIME_KEY)
 
     def add_notes(self, notes: list[Note]):
-        for note in notes:
-            if not isinstance(note, Note):
-                raise TypeError("All items in notes list must be Note objects.")
-            self.add_element(note)
+        # Check every note up front (so a bad item adds nothing), then extend
+        # and sort once instead of inserting note by note
+        notes = list(notes)
+        if not all(isinstance(note, Note) for note in notes):
+            raise TypeError("All items in notes list must be Note objects.")
+        self.elements.extend(notes)
+        self.elements.sort(key=_START_TIME_KEY)
+
+    def add_block_chord(self, pitches: list[int], start_time: float, duration: float, velocity: int = 100):
+        """
+        Adds a block chord from raw MIDI pitches in one call. The notes go
+        straight into the track's note columns (see add_note_fast) instead of
+        a Chord of Note objects; the exporter encodes them the same way. The
+        start time, duration and velocity are shared by every note, so they're
+        checked once.
+        """
+        if not pitches:
+            return
+        # Chord keeps its notes ordered by pitch, so store them that way too
+        pitches = sorted(pitches)
+        if not (0 <= pitches[0] and pitches[-1] <= 127):
+            raise ValueError("Pitch must be between 0 and 127.")
+        if not (0 <= velocity <= 127):
+            raise ValueError("Velocity must be between 0 and 127.")
+        if duration <= 0:
+            raise ValueError("Duration must be positive.")
+        if start_time < 0:
+            raise ValueError("Start time cannot be negative.")
+        voices = len(pitches)
+        self.note_pitches.extend(pitches)
+        self.note_starts.extend(repeat(start_time, voices))
+        self.note_durations.extend(repeat(duration, voices))
+        self.note_velocities.extend(repeat(velocity, voices))
+
+    def add_note_fast(self, pitch: int, start_time: float, duration: float, velocity: int = 100):
+        """
+        Adds a plain note as one row of the track's note columns instead of a
+        Note element. Meant for generators that add many single notes (e.g.
+        drum patterns): the exporter reads the columns directly, and nothing
+        is sorted on insert. Values are validated the same way as Note.
+        """
+        if not (0 <= pitch <= 127):
+            raise ValueError("Pitch must be between 0 and 127.")
+        if not (0 <= velocity <= 127):
+            raise ValueError("Velocity must be between 0 and 127.")
+        if duration <= 0:
+            raise ValueError("Duration must be positive.")
+        if start_time < 0:
+            raise ValueError("Start time cannot be negative.")
+        self.note_pitches.append(pitch)
+        self.note_starts.append(start_time)
+        self.note_durations.append(duration)
+        self.note_velocities.append(velocity)
+
+    def add_notes_fast(self, pitches, start_times, durations, velocities):
+        """
+        Bulk version of add_note_fast: appends whole columns (one entry per
+        note, in the order given) at once. Each column is validated with a
+        single min/max pass instead of once per note.
+        """
+        pitches = list(pitches)
+        start_times = list(start_times)
+        durations = list(durations)
+        velocities = list(velocities)
+        if not (len(pitches) == len(start_times) == len(durations) == len(velocities)):
+            raise ValueError("Note columns must all have the same length.")
+        if not pitches:
+            return
+        if not (0 <= min(pitches) and max(pitches) <= 127):
+            raise ValueError("Pitch must be between 0 and 127.")
+        if not (0 <= min(velocities) and max(velocities) <= 127):
+            raise ValueError("Velocity must be between 0 and 127.")
+        if min(durations) <= 0:
+            raise ValueError("Duration must be positive.")
+        if min(start_times) < 0:
+            raise ValueError("Start time cannot be negative.")
+        self.note_pitches.extend(pitches)
+        self.note_starts.extend(start_times)
+        self.note_durations.extend(durations)
+        self.note_velocities.extend(velocities)
 
     def set_instrument(self, instrument_program: int, name: str | None = None):
         if not (0 <= instrument_program <= 127):
@@ -40,5 +161,10 @@ class Track:
         if name: # Optionally update track name if a new instrument implies a role change
             self.name = name
 
+    @property
+    def element_count(self) -> int:
+        """Number of elements plus column notes; both lengths are O(1), so no running counter is kept."""
+        return len(self.elements) + len(self.note_pitches)
+
     def __repr__(self):
-        return f"Track(name='{self.name}', instrument_program={self.instrument_program}, channel={self.channel}, elements_count={len(self.elements)})"
\ No newline at end of file
+        return f"Track(name='{self.name}', instrument_program={self.instrument_program}, channel={self.channel}, elements_count={self.element_count})"
\ No newline at end of file
@@ -0,0 +1,10 @@
+# wsgi.py
+#
+# Production entry point. The `python app2.py` development server handles one
+# request at a time; run the app behind a multi-worker server instead, e.g.:
+#
+#   gunicorn -w 4 -k gthread --threads 8 --timeout 30 wsgi:application
+
+from app2 import app # type: ignore # app2 serves the current templates/index.html
+
+application = app